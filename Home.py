@@ -1,5 +1,9 @@
 import streamlit as st
 
+from core import metrics
+from core.artifacts import registry
+from core.assets import image_asset
+
 st.set_page_config(
     page_title = 'Loan Approval',
     page_icon = 'chart_with_downwords_trends',
@@ -8,7 +12,12 @@ st.set_page_config(
 )
 st.title('Loan Approval Dashboard')
 
-st.image('loan_image.png.PNG')
+# Timings and counters, exported only when LOAN_METRICS=1
+metrics.start()
+metrics.count_session(st.session_state, 'home')
+
+# A web-optimized copy of loan_image.png.PNG (see core.assets)
+st.image(image_asset())
 
 st.markdown("""
 Welcome to the Loan Approval Prediction App! 🏦
@@ -18,3 +27,9 @@ like income, credit score, employment, and more.
 
 Use the sidebar to explore and filter the data.
 """)
+
+# Artifacts are shared by every session in this process; show when they were loaded
+loaded_artifacts = registry.stats()
+if loaded_artifacts:
+    with st.expander('Loaded model and data artifacts'):
+        st.dataframe(loaded_artifacts)
@@ -0,0 +1,243 @@
+"""Benchmarks for the scoring hot path and the Analysis views.
+
+Measures artifact load time and resident memory, single-row and batched
+predict/predict_proba latency (sklearn pipeline and the flattened forest),
+and the render time of each Analysis view on 1x/10x/100x copies of
+loan_approval_dataset.csv. Results are written as flat JSON; --compare
+fails (exit status 1) when a metric is slower or larger than the baseline
+by more than --threshold, in its first run and in CONFIRM_RUNS more runs of
+its suite. Baselines are machine specific: regenerate
+benchmarks/baseline.json with --save on the machine that runs the check.
+
+Usage:
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.run --only predict
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+SCALES = (1, 10, 100)
+BATCH_SIZES = (1, 100, 10000)
+THRESHOLD = 0.25
+
+# Differences below these are treated as noise whatever the ratio
+NOISE_FLOOR = {'seconds': 0.002, 'bytes': 4 * 1024 * 1024}
+
+# Suites of regressed metrics are run this many more times; a metric keeps its best value
+CONFIRM_RUNS = 2
+
+
+def _median_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def _best_time(function, repeat, budget=0.5):
+    # Fastest of at least `repeat` runs, run until `budget` seconds have passed:
+    # scheduling and cache noise only ever add time, so the minimum is the
+    # stable estimate for the large batches whose median varies by 30%
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < repeat or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_load(repeat=3):
+    from core.artifacts import INFERENCE_PATH, MODEL_PATH
+    from core.export import measure
+
+    results = {}
+    for path in (MODEL_PATH, INFERENCE_PATH):
+        if not os.path.exists(path):
+            continue
+        runs = [measure(path) for _ in range(repeat)]
+        results[f'load.{path}.seconds'] = statistics.median(run['seconds'] for run in runs)
+        results[f'load.{path}.rss_bytes'] = statistics.median(run['rss_bytes'] for run in runs)
+    return results
+
+
+def bench_predict(batch_sizes=BATCH_SIZES):
+    from core.artifacts import load_pipeline, load_reference_frame
+    from core.forest import load_scorer
+
+    reference = load_reference_frame()
+    models = {'pipeline': load_pipeline(), 'flat': load_scorer()}
+    results = {}
+    for size in batch_sizes:
+        X = reference.sample(n=size, replace=size > len(reference), random_state=0).reset_index(drop=True)
+        repeat = 50 if size <= 100 else 20
+        for name, model in models.items():
+            model.predict_proba(X)
+            results[f'predict_proba.{name}.{size}.seconds'] = _best_time(lambda: model.predict_proba(X), repeat)
+            results[f'predict.{name}.{size}.seconds'] = _best_time(lambda: model.predict(X), repeat)
+    return results
+
+
+def _views_worker():
+    # Runs inside the scaled copy's directory; prints one JSON line of timings
+    import matplotlib
+    matplotlib.use('Agg')
+
+    from core.cube import load_cube
+    from core.figcache import figure_bytes
+    from core.views import VIEWS, all_views
+
+    results = {}
+    start = time.perf_counter()
+    load_cube()
+    results['cube.seconds'] = time.perf_counter() - start
+
+    # The first parameter set of every view, rendered to PNG as the page would
+    seen = set()
+    for name, params in all_views():
+        if name in seen:
+            continue
+        seen.add(name)
+        draw = lambda: figure_bytes(VIEWS[name](**params))
+        draw()
+        results[f'view.{name}.seconds'] = _median_time(draw, 3)
+    print(json.dumps(results))
+
+
+def write_scaled_dataset(path, scale, source=None):
+    # The CSV body repeated `scale` times under one header
+    from core.artifacts import DATASET_PATH
+
+    with open(source or os.path.join(ROOT, DATASET_PATH)) as file:
+        header = file.readline()
+        body = file.read()
+    if not body.endswith('\n'):
+        body += '\n'
+    with open(path, 'w') as file:
+        file.write(header)
+        for _ in range(scale):
+            file.write(body)
+
+
+def bench_views(scales=SCALES):
+    from core.artifacts import DATASET_PATH
+
+    results = {}
+    for scale in scales:
+        with tempfile.TemporaryDirectory(prefix=f'loan-bench-{scale}x-') as directory:
+            write_scaled_dataset(os.path.join(directory, DATASET_PATH), scale)
+            env = dict(os.environ, PYTHONPATH=ROOT)
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.run', '--views-worker'], cwd=directory,
+                                    env=env, check=True, capture_output=True, text=True).stdout
+            timings = json.loads(output.strip().splitlines()[-1])
+        results.update({f'{scale}x.{name}': value for name, value in timings.items()})
+    return results
+
+
+SUITES = {
+    'load': bench_load,
+    'predict': bench_predict,
+    'views': bench_views,
+}
+
+
+def run(suites=tuple(SUITES)):
+    results = {}
+    metrics = {}
+    for name in suites:
+        suite_results = SUITES[name]()
+        results.update(suite_results)
+        metrics[name] = sorted(suite_results)
+    return {
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'cpus': os.cpu_count()},
+        'created_at': time.time(),
+        'results': results,
+        'suites': metrics,
+    }
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    # Rows of (metric, baseline, current, ratio, regressed) for metrics present in both
+    rows = []
+    for metric, before in sorted(baseline['results'].items()):
+        after = current['results'].get(metric)
+        if after is None or not before:
+            continue
+        unit = 'bytes' if metric.endswith('_bytes') else 'seconds'
+        ratio = after / before
+        regressed = ratio > 1 + threshold and after - before > NOISE_FLOOR[unit]
+        rows.append((metric, before, after, ratio, regressed))
+    return rows
+
+
+def _format(metric, value):
+    if metric.endswith('_bytes'):
+        return f'{value / 1024 / 1024:.1f} MB'
+    return f'{value * 1000:.2f} ms'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark model loading, scoring and view rendering.')
+    parser.add_argument('--only', nargs='+', choices=sorted(SUITES), default=list(SUITES))
+    parser.add_argument('--save', metavar='PATH', help='write the results as JSON')
+    parser.add_argument('--compare', metavar='PATH', nargs='?', const=BASELINE_PATH,
+                        help='fail when a metric regresses against this baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed slowdown as a fraction of the baseline (default 0.25)')
+    parser.add_argument('--views-worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.views_worker:
+        _views_worker()
+        return 0
+
+    os.chdir(ROOT)
+    current = run(args.only)
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(current, file, indent=2, sort_keys=True)
+            file.write('\n')
+
+    if not args.compare:
+        for metric, value in sorted(current['results'].items()):
+            print(f'{metric:<55} {_format(metric, value):>12}')
+        return 0
+
+    with open(args.compare) as file:
+        baseline = json.load(file)
+    rows = compare(current, baseline, args.threshold)
+    for _ in range(CONFIRM_RUNS):
+        # A real regression shows up again; a noisy run rarely does twice more
+        regressed = {row[0] for row in rows if row[4]}
+        suites = [name for name, metrics in current['suites'].items() if regressed & set(metrics)]
+        if not suites:
+            break
+        rerun = run(suites)['results']
+        for metric in regressed:
+            current['results'][metric] = min(current['results'][metric], rerun.get(metric, float('inf')))
+        rows = compare(current, baseline, args.threshold)
+    for metric, before, after, ratio, regressed in rows:
+        flag = 'REGRESSED' if regressed else ''
+        print(f'{metric:<55} {_format(metric, before):>12} {_format(metric, after):>12} {ratio:>6.2f}x {flag}')
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f'{len(regressions)} of {len(rows)} metrics regressed by more than {args.threshold:.0%}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
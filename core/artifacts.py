@@ -0,0 +1,195 @@
+"""Process-wide registry of loaded model and data artifacts.
+
+Streamlit re-executes page scripts on every widget interaction, but imported
+modules live for the whole process, so artifacts held here are unpickled
+once and shared by every session and page.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from core.metrics import span
+
+MODEL_PATH = 'pipeline.pkl'
+INFERENCE_PATH = 'pipeline_inference.joblib'
+REFERENCE_PATH = 'df1.pkl'
+DATASET_PATH = 'loan_approval_dataset.csv'
+
+# Versioned model registry (see core.models)
+MODEL_DIR = os.environ.get('LOAN_MODEL_DIR', 'models')
+MANIFEST_NAME = 'manifest.json'
+
+
+def unpickle(path):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+def load_model_file(path):
+    # Inference artifacts written by core.export are memory-mapped joblib files
+    if str(path).endswith('.joblib'):
+        import joblib
+
+        return joblib.load(path, mmap_mode='r')
+    return unpickle(path)
+
+
+def read_json(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def active_version(directory=MODEL_DIR):
+    # (version, metadata) of the registry's active model, or None without one
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    manifest = registry.get(path, read_json)
+    version = manifest.get('active')
+    return (version, manifest['versions'][version]) if version else None
+
+
+def version_model_path(version, info, directory=MODEL_DIR):
+    return os.path.join(directory, version, info.get('inference') or info['model'])
+
+
+def reference_path_for(model_path):
+    # The feature frame published with a model (a registry version's own df1.pkl), else the root one
+    path = os.path.join(os.path.dirname(model_path), os.path.basename(REFERENCE_PATH))
+    return path if os.path.exists(path) else REFERENCE_PATH
+
+
+def export_is_current(src=MODEL_PATH, dst=INFERENCE_PATH):
+    # An export older than its pipeline was made from a model that has since been replaced
+    return os.path.exists(dst) and (not os.path.exists(src) or os.path.getmtime(dst) >= os.path.getmtime(src))
+
+
+def default_model_path():
+    # The registry's active version, else the exported pipeline unless it is stale, else the original
+    active = active_version()
+    if active is not None:
+        return version_model_path(*active)
+    return INFERENCE_PATH if export_is_current() else MODEL_PATH
+
+
+def read_dataset(path):
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    # Clean column names by stripping whitespace
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _Entry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = None
+        self.stamp = None
+        self.digest = None
+        self.load_seconds = None
+        self.loads = 0
+        self.loaded_at = None
+
+
+class ArtifactRegistry:
+    """Loads each artifact once and reloads it only when the file changes.
+
+    A change is detected from the file's mtime and size; with check_hash the
+    content hash must differ too, so touching a file does not force a reload.
+    """
+
+    def __init__(self, check_hash=False):
+        self.check_hash = check_hash
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            return entry
+
+    def get(self, path, loader=unpickle):
+        key = (os.path.abspath(path), loader)
+        entry = self._entry(key)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if entry.stamp == stamp:
+            return entry.value
+
+        # Only one thread loads a given artifact; the others wait and reuse it
+        with entry.lock:
+            if entry.stamp == stamp:
+                return entry.value
+            digest = file_digest(path) if self.check_hash else None
+            if digest is not None and digest == entry.digest:
+                entry.stamp = stamp
+                return entry.value
+
+            start = time.perf_counter()
+            with span(f'load.{loader.__name__}'):
+                value = loader(path)
+            entry.load_seconds = time.perf_counter() - start
+            entry.value = value
+            entry.digest = digest
+            entry.loads += 1
+            entry.loaded_at = time.time()
+            entry.stamp = stamp
+            return value
+
+    def stats(self):
+        with self._lock:
+            items = list(self._entries.items())
+        return [
+            {
+                'path': os.path.relpath(path),
+                'loader': loader.__name__,
+                'size_bytes': entry.stamp[1] if entry.stamp else None,
+                'loads': entry.loads,
+                'load_seconds': entry.load_seconds,
+                'loaded_at': entry.loaded_at,
+                'sha256': entry.digest,
+            }
+            for (path, loader), entry in items
+        ]
+
+    def forget(self, path):
+        # Drops every artifact loaded from `path`, e.g. a model version no longer served
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+registry = ArtifactRegistry(check_hash=os.environ.get('LOAN_ARTIFACT_HASH') == '1')
+
+
+def load_pipeline(path=None):
+    # Prefer the slim inference artifact when it has been exported
+    return registry.get(path or default_model_path(), load_model_file)
+
+
+def load_reference_frame(path=REFERENCE_PATH):
+    return registry.get(path)
+
+
+def load_dataset(path=DATASET_PATH):
+    return registry.get(path, read_dataset)
@@ -0,0 +1,73 @@
+"""Web-optimized copies of the app's images.
+
+loan_image.png.PNG is a 570 KB lossless PNG with an alpha channel that is
+fully opaque. Home.py serves an optimized copy instead: a progressive JPEG
+(about 60 KB) when the image has no transparency, a 256-colour PNG when it
+does, at most MAX_WIDTH pixels wide. Both are formats st.image passes through
+as they are; any other format or a wider image would be decoded and
+re-encoded by Streamlit on every run of the page.
+
+The copy is written at build time (see render.yaml) or on first use, and is
+rebuilt whenever the source image is newer.
+
+Usage:
+    python -m core.assets            # write loan_image.jpg
+"""
+import argparse
+import os
+
+HOME_IMAGE = 'loan_image.png.PNG'
+
+# Widest image st.image shows unresized (Streamlit's MAXIMUM_CONTENT_WIDTH)
+MAX_WIDTH = 1460
+JPEG_QUALITY = 85
+
+
+def _candidates(src):
+    # Where the optimized copy of `src` is written: JPEG if opaque, else PNG
+    stem = os.path.splitext(src)[0].split('.')[0]
+    return [stem + '.jpg', stem + '.min.png']
+
+
+def optimize_image(src, dst=None, max_width=MAX_WIDTH, quality=JPEG_QUALITY):
+    from PIL import Image
+
+    with Image.open(src) as image:
+        image.load()
+    if image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+    opaque = image.mode not in ('RGBA', 'LA', 'P') or image.convert('RGBA').getextrema()[3][0] == 255
+    dst = dst or _candidates(src)[0 if opaque else 1]
+    # Written under a temporary name so a concurrent reader never sees half a file
+    tmp_path = f'{dst}.{os.getpid()}.tmp'
+    if opaque:
+        image.convert('RGB').save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.quantize(256, method=Image.Quantize.FASTOCTREE).save(tmp_path, 'PNG', optimize=True)
+    os.replace(tmp_path, dst)
+    return dst
+
+
+def image_asset(src=HOME_IMAGE):
+    # Path of the optimized copy, written if missing or stale; the original if it cannot be
+    for path in _candidates(src):
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(src):
+            return path
+    try:
+        return optimize_image(src)
+    except OSError:
+        return src
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write web-optimized copies of the app images.')
+    parser.add_argument('images', nargs='*', default=[HOME_IMAGE])
+    args = parser.parse_args(argv)
+
+    for src in args.images:
+        dst = optimize_image(src)
+        print(f"Wrote {dst} ({os.path.getsize(src):,} -> {os.path.getsize(dst):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
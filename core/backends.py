@@ -0,0 +1,272 @@
+"""Out-of-core query backends for the Analysis aggregates.
+
+The default (pandas) path reads the needed columns of the Parquet store into
+memory and builds the cube from the rows. Above IN_MEMORY_MAX_ROWS, or when
+LOAN_ANALYSIS_BACKEND names one, the cube is instead built from a handful of
+grouped queries that never materialize the rows:
+
+    aggregate       count and sums per combination of the cube dimensions
+    value_counts    rows per (dimension, measure value), for quantiles and
+                    box plots computed exactly from the counts
+    batches         the rows in bounded batches, for one-pass quantile
+                    sketches (see core.sketch) instead of the value counts
+    sample          a uniform sample of a few columns, for the pairplot
+
+Three implementations answer them: DuckDB and Polars (optional, pushed-down
+streaming queries over the Parquet file) and a pure pyarrow/pandas backend
+that streams record batches and merges partial aggregates.
+
+Environment:
+    LOAN_ANALYSIS_BACKEND   auto (default), pandas, chunked, duckdb or polars
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.artifacts import DATASET_PATH, registry
+from core.dataset import ensure_store, load_columns
+from core.derived import bracket_bins, bracket_codes
+
+IN_MEMORY_MAX_ROWS = int(os.environ.get('LOAN_IN_MEMORY_MAX_ROWS', 5000000))
+BATCH_ROWS = 1000000
+PAIRPLOT_SAMPLE_ROWS = 1000000
+
+
+def _bracket_sql(column, bins):
+    # Right-closed intervals, as bracket_codes and pd.cut
+    cases = ' '.join(f'WHEN {column} > {low} AND {column} <= {high} THEN {code}'
+                     for code, (low, high) in enumerate(zip(bins[:-1], bins[1:])))
+    return f'CASE {cases} ELSE -1 END'
+
+
+def _bracket_polars(column, bins):
+    import polars as pl
+
+    value = pl.col(column)
+    expression = pl.lit(-1)
+    for code in reversed(range(len(bins) - 1)):
+        expression = pl.when((value > bins[code]) & (value <= bins[code + 1])).then(code).otherwise(expression)
+    return expression.cast(pl.Int8)
+
+
+class ChunkedBackend:
+    """Streams record batches with pyarrow and merges per-batch pandas aggregates."""
+
+    name = 'chunked'
+
+    def __init__(self, path, batch_rows=BATCH_ROWS):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.batch_rows = batch_rows
+        self.rows = pq.ParquetFile(path).metadata.num_rows
+
+    def _batches(self, columns):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(self.path).iter_batches(batch_size=self.batch_rows, columns=columns):
+            yield batch.to_pandas()
+
+    def income_max(self):
+        return max(chunk['income_annum'].max() for chunk in self._batches(['income_annum']))
+
+    def _with_derived(self, chunk, bins):
+        for name, edges in bins.items():
+            chunk[name] = bracket_codes(chunk['income_annum'].to_numpy(), edges)
+        return chunk
+
+    def batches(self, columns, bins):
+        # `columns` may name derived brackets; they are computed per batch
+        for chunk in self._batches(sorted(set(columns) - set(bins) | {'income_annum'})):
+            yield self._with_derived(chunk, bins)
+
+    def aggregate(self, dimensions, measures, bins):
+        total = None
+        for chunk in self.batches(set(dimensions) | set(measures), bins):
+            grouped = chunk.groupby(dimensions, observed=True)
+            part = grouped[measures].sum()
+            part.insert(0, 'count', grouped.size())
+            # Partial results are merged as they arrive, so memory holds one batch
+            total = part if total is None else total.add(part, fill_value=0)
+        return total.reset_index()
+
+    def value_counts(self, pairs, bins):
+        columns = sorted({column for pair in pairs for column in pair} - set(bins) | {'income_annum'})
+        totals = {}
+        for chunk in self.batches(columns, bins):
+            for pair in pairs:
+                part = chunk.groupby(list(pair), observed=True).size()
+                totals[pair] = part if pair not in totals else totals[pair].add(part, fill_value=0)
+        return {pair: counts.rename('count').reset_index() for pair, counts in totals.items()}
+
+    def sample(self, columns, n, seed=0):
+        fraction = min(1.0, n / max(self.rows, 1))
+        rng = np.random.default_rng(seed)
+        parts = [chunk[rng.random(len(chunk)) < fraction] for chunk in self._batches(list(columns))]
+        return pd.concat(parts, ignore_index=True)
+
+
+class DuckDBBackend:
+    """Pushed-down SQL over the Parquet file; DuckDB streams and spills as needed."""
+
+    name = 'duckdb'
+
+    def __init__(self, path):
+        import duckdb
+
+        self.path = path
+        self.connection = duckdb.connect()
+        self.connection.execute('SET enable_progress_bar = false')
+        self.source = "read_parquet('{}')".format(path.replace("'", "''"))
+
+    def _query(self, sql):
+        return self.connection.execute(sql).df()
+
+    def _from(self, bins):
+        derived = ''.join(f', {_bracket_sql("income_annum", edges)} AS {name}' for name, edges in bins.items())
+        return f'(SELECT *{derived} FROM {self.source})'
+
+    def income_max(self):
+        return self._query(f'SELECT max(income_annum) AS income_max FROM {self.source}')['income_max'].iloc[0]
+
+    def aggregate(self, dimensions, measures, bins):
+        sums = ''.join(f', sum({measure})::DOUBLE AS {measure}' for measure in measures)
+        keys = ', '.join(dimensions)
+        return self._query(f'SELECT {keys}, count(*) AS count{sums} FROM {self._from(bins)} GROUP BY {keys}')
+
+    def value_counts(self, pairs, bins):
+        source = self._from(bins)
+        return {
+            (dimension, measure): self._query(
+                f'SELECT {dimension}, {measure}, count(*) AS count FROM {source} GROUP BY {dimension}, {measure}')
+            for dimension, measure in pairs
+        }
+
+    def batches(self, columns, bins):
+        keys = ', '.join(columns)
+        result = self.connection.execute(f'SELECT {keys} FROM {self._from(bins)}')
+        # to_arrow_reader replaced fetch_record_batch in newer DuckDB releases
+        reader = getattr(result, 'to_arrow_reader', None) or result.fetch_record_batch
+        for batch in reader(BATCH_ROWS):
+            yield batch.to_pandas()
+
+    def sample(self, columns, n, seed=0):
+        keys = ', '.join(columns)
+        return self._query(
+            f'SELECT {keys} FROM {self.source} USING SAMPLE reservoir({int(n)} ROWS) REPEATABLE ({seed})')
+
+
+class PolarsBackend:
+    """Lazy Polars queries over the Parquet file, collected with the streaming engine."""
+
+    name = 'polars'
+
+    def __init__(self, path):
+        import polars as pl
+
+        self.path = path
+        self.rows = pl.scan_parquet(path).select(pl.len()).collect().item()
+
+    def _frame(self, bins=None):
+        import polars as pl
+
+        frame = pl.scan_parquet(self.path)
+        if bins:
+            frame = frame.with_columns([_bracket_polars('income_annum', edges).alias(name)
+                                        for name, edges in bins.items()])
+        return frame
+
+    def income_max(self):
+        import polars as pl
+
+        return self._frame().select(pl.col('income_annum').max()).collect(engine='streaming').item()
+
+    def aggregate(self, dimensions, measures, bins):
+        import polars as pl
+
+        # Int32 sums would overflow in Polars; sum as Int64 like pandas does
+        sums = [pl.col(measure).cast(pl.Int64).sum().cast(pl.Float64) for measure in measures]
+        query = self._frame(bins).group_by(dimensions).agg(pl.len().alias('count'), *sums)
+        return query.collect(engine='streaming').to_pandas()
+
+    def value_counts(self, pairs, bins):
+        import polars as pl
+
+        frame = self._frame(bins)
+        return {pair: frame.group_by(list(pair)).agg(pl.len().alias('count'))
+                .collect(engine='streaming').to_pandas() for pair in pairs}
+
+    def batches(self, columns, bins):
+        for batch in self._frame(bins).select(list(columns)).collect_batches(chunk_size=BATCH_ROWS):
+            yield batch.to_pandas()
+
+    def sample(self, columns, n, seed=0):
+        import polars as pl
+
+        # Rows whose hashed index falls under the sampling fraction: a uniform, streamable sample
+        threshold = int(min(1.0, n / max(self.rows, 1)) * (2 ** 64 - 1))
+        query = (self._frame().with_row_index('_row')
+                 .filter(pl.col('_row').hash(seed) < threshold)
+                 .select(list(columns)))
+        return query.collect(engine='streaming').to_pandas()
+
+
+BACKENDS = {
+    'chunked': ChunkedBackend,
+    'duckdb': DuckDBBackend,
+    'polars': PolarsBackend,
+}
+
+
+def _available(name):
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+def backend_name(path, name=None):
+    # None selects the in-memory pandas path
+    name = name or os.environ.get('LOAN_ANALYSIS_BACKEND', 'auto')
+    if name == 'pandas':
+        return None
+    if name == 'auto':
+        import pyarrow.parquet as pq
+
+        if pq.ParquetFile(path).metadata.num_rows <= IN_MEMORY_MAX_ROWS:
+            return None
+        name = next((candidate for candidate in ('duckdb', 'polars') if _available(candidate)), 'chunked')
+    return name
+
+
+def query_backend(path, name=None):
+    name = backend_name(path, name)
+    return BACKENDS[name](path) if name is not None else None
+
+
+def derived_bins(backend):
+    return bracket_bins(backend.income_max())
+
+
+_sample_loaders = {}
+
+
+def _sample_loader(columns):
+    # One named loader per column set, so the registry caches each sample separately
+    loader = _sample_loaders.get(columns)
+    if loader is None:
+        def loader(path):
+            return query_backend(path).sample(columns, PAIRPLOT_SAMPLE_ROWS)
+        loader.__name__ = f"sample_columns[{','.join(columns)}]"
+        loader = _sample_loaders.setdefault(columns, loader)
+    return loader
+
+
+def load_sample(columns, csv_path=DATASET_PATH):
+    # All rows of small stores; a uniform sample of PAIRPLOT_SAMPLE_ROWS from large ones
+    store_path = ensure_store(csv_path)
+    if backend_name(store_path) is None:
+        return load_columns(columns, csv_path)
+    return registry.get(store_path, _sample_loader(tuple(columns)))
@@ -0,0 +1,90 @@
+"""Matplotlib drawing helpers for charts answered from precomputed aggregates."""
+import numpy as np
+
+
+def draw_box(ax, stats, palette=None):
+    # Box plot from precomputed statistics (see AggregateCube.box_stats)
+    artists = ax.bxp(stats, showfliers=True, patch_artist=True,
+                     medianprops={'color': 'black'},
+                     flierprops={'marker': 'd', 'markersize': 4, 'markerfacecolor': 'grey',
+                                 'markeredgecolor': 'grey'})
+    if palette is not None:
+        import seaborn as sns
+
+        colors = sns.color_palette(palette, len(stats))
+    else:
+        colors = ['C0'] * len(stats)
+    for patch, color in zip(artists['boxes'], colors):
+        patch.set_facecolor(color)
+    return artists
+
+
+def draw_histogram(ax, histogram, kde=None, total=None, color='purple'):
+    # Histogram bars from (counts, edges), plus a KDE curve scaled to counts
+    counts, edges = histogram
+    ax.stairs(counts, edges, fill=True, color=color, alpha=0.5)
+    ax.stairs(counts, edges, color=color)
+    if kde is not None:
+        grid, density = kde
+        total = counts.sum() if total is None else total
+        ax.plot(grid, density * total * np.diff(edges).mean(), color=color)
+
+
+# Above this many rows the pairplot switches from scatter to binned density
+SCATTER_MAX_POINTS = 20000
+PAIRPLOT_BINS = 50
+
+
+def stratified_sample(df, n, by=None, seed=0):
+    # Proportional sample from each group of `by` (or a plain sample without it)
+    if len(df) <= n:
+        return df
+    if by is None or by not in df.columns:
+        return df.sample(n=n, random_state=seed)
+    fraction = n / len(df)
+    return df.groupby(by, observed=True, group_keys=False).sample(frac=fraction, random_state=seed)
+
+
+def pairplot(df, columns, mode='auto', max_points=SCATTER_MAX_POINTS, bins=PAIRPLOT_BINS, stratify=None):
+    from matplotlib.colors import LogNorm
+    from matplotlib.figure import Figure
+
+    if mode == 'auto':
+        mode = 'scatter' if len(df) <= max_points else 'density'
+    if mode == 'sample':
+        df = stratified_sample(df, max_points, by=stratify)
+
+    n = len(columns)
+    fig = Figure(figsize=(2.5 * n, 2.5 * n), layout='tight')
+    axes = fig.subplots(n, n, squeeze=False)
+
+    # Each column is binned once; every histogram and 2D density reuses the codes
+    values = [df[column].to_numpy(dtype=float) for column in columns]
+    edges = [np.histogram_bin_edges(v, bins=bins) for v in values]
+    codes = [np.clip(np.searchsorted(e, v, side='right') - 1, 0, bins - 1) for v, e in zip(values, edges)]
+
+    for i in range(n):
+        for j in range(n):
+            ax = axes[i, j]
+            if i == j:
+                # Histogram on a twin axis so the row keeps the column's own scale
+                hist_ax = ax.twinx()
+                hist_ax.stairs(np.bincount(codes[i], minlength=bins), edges[i], fill=True, alpha=0.6)
+                hist_ax.set_yticks([])
+                ax.set_ylim(edges[i][0], edges[i][-1])
+            elif mode == 'density':
+                counts = np.bincount(codes[i] * bins + codes[j], minlength=bins * bins).reshape(bins, bins)
+                counts = np.ma.masked_equal(counts, 0)
+                ax.pcolormesh(edges[j], edges[i], counts, norm=LogNorm(), cmap='Blues', shading='flat')
+            else:
+                ax.scatter(values[j], values[i], s=6, alpha=0.6, linewidths=0)
+            ax.set_xlim(edges[j][0], edges[j][-1])
+            if j == 0:
+                ax.set_ylabel(columns[i])
+            else:
+                ax.tick_params(labelleft=False)
+            if i == n - 1:
+                ax.set_xlabel(columns[j])
+            else:
+                ax.tick_params(labelbottom=False)
+    return fig
@@ -0,0 +1,397 @@
+"""Precomputed aggregates for the Analysis page.
+
+The cube is built once per dataset version and answers every table and chart
+on the page (status counts, group means, box plot statistics, summaries and
+histograms) in O(groups) instead of re-filtering the raw rows on each click.
+Small stores are built from the rows in memory; large ones from grouped
+queries run by an out-of-core backend (see core.backends).
+
+Quantiles (box plots and the quartiles of describe()) are exact in memory.
+Out of core they come from mergeable KLL sketches built in one pass over the
+rows (see core.sketch), with a rank error of about 0.5%; LOAN_QUANTILES=exact
+computes them from per-value counts instead, and LOAN_QUANTILES=sketch uses
+sketches in memory too. Counts, means, standard deviations and extremes are
+always exact.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.artifacts import DATASET_PATH, registry
+from core.dataset import ensure_store, read_columns
+from core.backends import derived_bins, query_backend
+from core.derived import BRACKET_LABELS, DerivedFeatures, read_derived
+from core.schema import TARGET
+from core.sketch import merged, sketch_groups
+
+# auto (sketches out of core only), exact or sketch
+QUANTILES = os.environ.get('LOAN_QUANTILES', 'auto')
+
+DIMENSIONS = ['no_of_dependents', 'education', 'self_employed', 'income_range',
+              'income_bracket', 'loan_term', TARGET]
+
+MEASURES = ['income_annum', 'loan_amount', 'loan_term', 'cibil_score', 'residential_assets_value',
+            'commercial_assets_value', 'luxury_assets_value', 'bank_asset_value']
+
+# Columns the cube reads from the store; the income brackets are derived
+COLUMNS = MEASURES + [column for column in DIMENSIONS
+                      if column not in MEASURES and column not in ('income_range', 'income_bracket')]
+
+BOX_DIMENSIONS = ['no_of_dependents', 'income_bracket', 'loan_term', 'education', 'self_employed', TARGET]
+
+BOX_PAIRS = [(dimension, measure) for dimension in BOX_DIMENSIONS for measure in MEASURES if measure != dimension]
+
+HISTOGRAM_BINS = (10, 30)
+
+KDE_POINTS = 512
+
+# Box plots keep at most this many outliers per group
+MAX_FLIERS = 500
+
+
+def _box_stats(frame, measures, groups):
+    # Same statistics as matplotlib's boxplot_stats (whis=1.5) for every
+    # measure at once: one grouped quantile pass per dimension
+    values = frame[measures]
+    grouped = values.groupby(groups, observed=True)
+    quartiles = grouped.quantile([0.25, 0.5, 0.75])
+    q1 = quartiles.xs(0.25, level=-1)
+    q3 = quartiles.xs(0.75, level=-1)
+    iqr = q3 - q1
+
+    # Broadcast each group's fences back onto its rows
+    positions = q1.index.get_indexer(groups)
+    valid = positions >= 0
+    low = (q1 - 1.5 * iqr).to_numpy()[positions]
+    high = (q3 + 1.5 * iqr).to_numpy()[positions]
+    raw = values.to_numpy(dtype=float)
+    inside = (raw >= low) & (raw <= high) & valid[:, None]
+
+    inner = pd.DataFrame(np.where(inside, raw, np.nan), columns=measures, index=values.index)
+    whislo = inner.groupby(groups, observed=True).min()
+    whishi = inner.groupby(groups, observed=True).max()
+    means = grouped.mean()
+
+    stats = {}
+    for k, measure in enumerate(measures):
+        table = pd.DataFrame({
+            'q1': q1[measure],
+            'med': quartiles.xs(0.5, level=-1)[measure],
+            'q3': q3[measure],
+            'whislo': whislo[measure],
+            'whishi': whishi[measure],
+            'mean': means[measure],
+        })
+        outside = ~inside[:, k] & valid
+        fliers = {
+            key: group.to_numpy()[np.linspace(0, len(group) - 1, min(len(group), MAX_FLIERS)).astype(int)]
+            for key, group in values[measure][outside].groupby(groups[outside], observed=True)
+        }
+        table['fliers'] = [fliers.get(key, np.array([])) for key in table.index]
+        stats[measure] = table
+    return stats
+
+
+def _kde(data, points=KDE_POINTS, weights=None):
+    # Gaussian KDE with Scott's bandwidth (as scipy's gaussian_kde), evaluated
+    # on a grid by binning the data once and convolving with the kernel
+    grid = np.linspace(data.min(), data.max(), points)
+    step = grid[1] - grid[0]
+    n = len(data) if weights is None else weights.sum()
+    mean = np.average(data, weights=weights)
+    std = np.sqrt(np.average((data - mean) ** 2, weights=weights) * n / (n - 1))
+    bandwidth = std * n ** (-1 / 5)
+    counts, _ = np.histogram(data, bins=points, range=(grid[0] - step / 2, grid[-1] + step / 2), weights=weights)
+    half_width = int(np.ceil(4 * bandwidth / step))
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    density = np.convolve(counts, kernel, mode='full')[half_width:half_width + points] / n
+    return grid, density
+
+
+def _histograms(values):
+    data = values.dropna().to_numpy(dtype=float)
+    histograms = {}
+    for bins in HISTOGRAM_BINS:
+        histograms[bins] = np.histogram(data, bins=bins)
+
+    kde = None
+    if len(data) > 1 and data.min() < data.max():
+        kde = _kde(data)
+    return histograms, kde
+
+
+def _weighted_quantiles(values, counts, qs):
+    # pandas' default (linear) quantiles of the data with `values` repeated `counts` times
+    cumulative = np.cumsum(counts)
+    positions = (cumulative[-1] - 1) * np.asarray(qs, dtype=float)
+    lower = np.floor(positions)
+    low = values[np.searchsorted(cumulative, lower, side='right')]
+    high = values[np.searchsorted(cumulative, np.minimum(lower + 1, cumulative[-1] - 1), side='right')]
+    return low + (high - low) * (positions - lower)
+
+
+def _spread(values, counts, limit):
+    # At most `limit` evenly spaced values of the expanded data, without expanding it
+    cumulative = np.cumsum(counts)
+    if not len(cumulative) or cumulative[-1] == 0:
+        return np.array([])
+    positions = np.linspace(0, cumulative[-1] - 1, min(cumulative[-1], limit)).astype(np.int64)
+    return values[np.searchsorted(cumulative, positions, side='right')]
+
+
+def _count_stats(values, counts):
+    # Box plot statistics (whis=1.5), mean and summary of one group's value counts
+    order = np.argsort(values, kind='stable')
+    values = np.asarray(values, dtype=float)[order]
+    counts = np.asarray(counts, dtype=np.int64)[order]
+    n = counts.sum()
+    q1, med, q3 = _weighted_quantiles(values, counts, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+    mean = (values * counts).sum() / n
+    return {
+        'q1': q1, 'med': med, 'q3': q3,
+        'whislo': values[inside].min() if inside.any() else np.nan,
+        'whishi': values[inside].max() if inside.any() else np.nan,
+        'mean': mean,
+        'fliers': _spread(values[~inside], counts[~inside], MAX_FLIERS),
+        'count': n,
+        'std': np.sqrt((counts * (values - mean) ** 2).sum() / (n - 1)) if n > 1 else np.nan,
+        'min': values[0], 'max': values[-1],
+    }
+
+
+def _sketch_side(tail, outside, values, weights):
+    # Whisker and (value, weight) outliers on one side of the fences. The
+    # exact tail holds every outlier once one of its values is inside; only
+    # when all of it is outside do the sketch's weighted items fill in.
+    inner = tail[~outside(tail)]
+    if len(inner):
+        fliers = tail[outside(tail)]
+        return inner, fliers, np.ones(len(fliers), dtype=np.int64)
+    beyond = outside(values)
+    fliers = np.concatenate([tail, values[beyond]])
+    return values[~beyond], fliers, np.concatenate([np.ones(len(tail), dtype=np.int64),
+                                                   weights[beyond].astype(np.int64)])
+
+
+def _sketch_stats(sketch):
+    # _count_stats from a sketch: approximate quartiles; exact count, mean,
+    # standard deviation and extremes; whiskers and outliers exact unless a
+    # side has more outliers than the sketch's exact tail holds
+    values, weights = sketch.weighted_items()
+    q1, med, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inner_low, fliers_low, weights_low = _sketch_side(sketch.lowest, lambda v: v < low, values, weights)
+    inner_high, fliers_high, weights_high = _sketch_side(sketch.highest, lambda v: v > high, values, weights)
+    fliers = np.concatenate([fliers_low, fliers_high])
+    order = np.argsort(fliers, kind='stable')
+    return {
+        'q1': q1, 'med': med, 'q3': q3,
+        'whislo': inner_low.min() if len(inner_low) else np.nan,
+        'whishi': inner_high.max() if len(inner_high) else np.nan,
+        'mean': sketch.mean,
+        'fliers': _spread(fliers[order], np.concatenate([weights_low, weights_high])[order], MAX_FLIERS),
+        'count': sketch.count,
+        'std': sketch.std,
+        'min': sketch.minimum, 'max': sketch.maximum,
+    }
+
+
+def _sketch_boxes(sketches):
+    # Box plot tables from the per-group sketches of every (dimension, measure)
+    boxes = {}
+    for (dimension, measure), groups in sketches.items():
+        labels = BRACKET_LABELS.get(dimension)
+        rows = {}
+        for key in sorted(groups):
+            # Bracket codes of -1 (outside every bin) are dropped, as missing values in groupby
+            if labels is not None and key < 0:
+                continue
+            stats = _sketch_stats(groups[key])
+            rows[labels[key] if labels is not None else key] = {
+                name: stats[name] for name in ('q1', 'med', 'q3', 'whislo', 'whishi', 'mean', 'fliers')}
+        boxes[measure, dimension] = pd.DataFrame.from_dict(rows, orient='index')
+    return boxes
+
+
+def _summary(stats):
+    # describe() of one column from _count_stats or _sketch_stats
+    return pd.Series([stats['count'], stats['mean'], stats['std'], stats['min'], stats['q1'], stats['med'],
+                      stats['q3'], stats['max']],
+                     index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'], dtype=float)
+
+
+def _labelled(frame, dimension):
+    # Derived bracket codes become the same ordered categoricals as the in-memory path
+    labels = BRACKET_LABELS.get(dimension)
+    if labels is not None:
+        frame[dimension] = pd.Categorical.from_codes(frame[dimension].astype(int), categories=labels, ordered=True)
+    return frame
+
+
+class AggregateCube:
+
+    def __init__(self, base, boxes, summaries, histograms, kdes):
+        self.base = base
+        self.boxes = boxes
+        self.summaries = summaries
+        self.histograms = histograms
+        self.kdes = kdes
+
+    @classmethod
+    def build(cls, df, derived=None):
+        if derived is None:
+            derived = DerivedFeatures.from_income(df['income_annum'])
+        # A new frame over the shared columns; the cached DataFrame is never written
+        frame = pd.DataFrame({column: df[column] for column in COLUMNS}, copy=False)
+        for name, column in derived.columns(index=df.index).items():
+            frame[name] = column
+
+        # One groupby over every dimension; coarser answers are roll-ups of it
+        measures = [m for m in MEASURES if m not in DIMENSIONS]
+        grouped = frame.groupby(DIMENSIONS, observed=True, dropna=False)
+        base = grouped[measures].sum()
+        base.insert(0, 'count', grouped.size())
+        base = base.reset_index()
+
+        if QUANTILES == 'sketch':
+            # Brackets are sketched by code, like the rows an out-of-core backend returns
+            columns = {column: frame[column] for column in COLUMNS}
+            columns.update({name: derived.codes(name) for name in derived.names()})
+            sketches = sketch_groups([pd.DataFrame(columns, index=frame.index, copy=False)], BOX_PAIRS)
+            boxes = _sketch_boxes(sketches)
+            summaries = pd.DataFrame({measure: _summary(_sketch_stats(merged(sketches[TARGET, measure].values())))
+                                      for measure in MEASURES})
+        else:
+            boxes = {}
+            for dimension in BOX_DIMENSIONS:
+                measures = [measure for measure in MEASURES if measure != dimension]
+                for measure, stats in _box_stats(frame, measures, frame[dimension]).items():
+                    boxes[measure, dimension] = stats
+            summaries = frame[MEASURES].describe()
+
+        histograms = {}
+        kdes = {}
+        for measure in MEASURES:
+            histograms[measure], kdes[measure] = _histograms(frame[measure])
+        return cls(base, boxes, summaries, histograms, kdes)
+
+    @classmethod
+    def from_backend(cls, backend):
+        # Same aggregates as build(), from grouped queries instead of rows in memory
+        bins = derived_bins(backend)
+        measures = [m for m in MEASURES if m not in DIMENSIONS]
+        base = backend.aggregate(DIMENSIONS, measures, bins)
+        base['count'] = base['count'].astype(np.int64)
+        for dimension in bins:
+            base = _labelled(base, dimension)
+        base = base.sort_values(DIMENSIONS, ignore_index=True)[DIMENSIONS + ['count'] + measures]
+
+        if QUANTILES != 'exact':
+            return cls(base, *cls._sketched(backend, bins))
+
+        value_counts = backend.value_counts(BOX_PAIRS, bins)
+
+        boxes = {}
+        for (dimension, measure), table in value_counts.items():
+            table = _labelled(table, dimension)
+            rows = {}
+            for key, group in table.groupby(dimension, observed=True, sort=True):
+                stats = _count_stats(group[measure].to_numpy(), group['count'].to_numpy())
+                rows[key] = {name: stats[name] for name in ('q1', 'med', 'q3', 'whislo', 'whishi', 'mean', 'fliers')}
+            boxes[measure, dimension] = pd.DataFrame.from_dict(rows, orient='index')
+
+        # Whole-column statistics come from the per-status counts summed over status
+        summaries = {}
+        histograms = {}
+        kdes = {}
+        for measure in MEASURES:
+            table = value_counts.get((TARGET, measure))
+            counts = table.groupby(measure)['count'].sum()
+            values = counts.index.to_numpy(dtype=float)
+            weights = counts.to_numpy(dtype=np.int64)
+            summaries[measure] = _summary(_count_stats(values, weights))
+            histograms[measure] = {bins: (np.histogram(values, bins=bins, weights=weights)[0].astype(np.int64),
+                                          np.histogram_bin_edges(values, bins=bins))
+                                   for bins in HISTOGRAM_BINS}
+            kdes[measure] = _kde(values, weights=weights) if len(values) > 1 else None
+        return cls(base, boxes, pd.DataFrame(summaries), histograms, kdes)
+
+    @staticmethod
+    def _sketched(backend, bins):
+        # Boxes, summaries, histograms and KDEs from one pass of quantile sketches
+        columns = sorted({column for pair in BOX_PAIRS for column in pair})
+        sketches = sketch_groups(backend.batches(columns, bins), BOX_PAIRS)
+        boxes = _sketch_boxes(sketches)
+
+        # Whole-column sketches are the per-status sketches merged
+        summaries = {}
+        histograms = {}
+        kdes = {}
+        for measure in MEASURES:
+            sketch = merged(sketches[TARGET, measure].values())
+            summaries[measure] = _summary(_sketch_stats(sketch))
+            values, weights = sketch.weighted_items()
+            span = (sketch.minimum, sketch.maximum)
+            histograms[measure] = {bins: (np.histogram(values, bins=bins, range=span, weights=weights)[0]
+                                          .astype(np.int64), np.histogram_bin_edges(values, bins=bins, range=span))
+                                   for bins in HISTOGRAM_BINS}
+            kdes[measure] = _kde(values, weights=weights) if sketch.minimum < sketch.maximum else None
+        return boxes, pd.DataFrame(summaries), histograms, kdes
+
+    def values(self, dimension):
+        return self.base[dimension].dropna().unique().tolist()
+
+    def counts(self, by, where=None):
+        base = self.base
+        for column, value in (where or {}).items():
+            base = base[base[column] == value]
+        return base.groupby(by, observed=True)['count'].sum()
+
+    def status_counts(self, dimension, value):
+        # Equivalent to df[df[dimension] == value]['loan_status'].value_counts()
+        counts = self.counts(TARGET, {dimension: value})
+        return counts[counts > 0].sort_values(ascending=False, kind='stable').rename('count')
+
+    def means(self, measure, by):
+        grouped = self.base.groupby(by, observed=True)
+        if measure == by:
+            raise ValueError('cannot average a dimension by itself')
+        if measure in DIMENSIONS:
+            totals = (self.base[measure] * self.base['count']).groupby(self.base[by], observed=True).sum()
+        else:
+            totals = grouped[measure].sum()
+        return (totals / grouped['count'].sum()).rename(measure).reset_index()
+
+    def box_stats(self, measure, by):
+        stats = self.boxes[measure, by]
+        return [dict(row, label=str(label)) for label, row in stats.to_dict(orient='index').items()]
+
+    def describe(self, measure):
+        return self.summaries[measure]
+
+    def histogram(self, measure, bins=30):
+        return self.histograms[measure][bins]
+
+    def kde(self, measure):
+        return self.kdes[measure]
+
+
+def build_cube(df, derived=None):
+    return AggregateCube.build(df, derived)
+
+
+def read_cube(path):
+    backend = query_backend(path)
+    if backend is not None:
+        return AggregateCube.from_backend(backend)
+    return build_cube(read_columns(path, COLUMNS), registry.get(path, read_derived))
+
+
+def load_cube(csv_path=DATASET_PATH):
+    # Rebuilt only when the columnar store (and so the CSV) changes
+    return registry.get(ensure_store(csv_path), read_cube)
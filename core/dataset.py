@@ -0,0 +1,146 @@
+"""Columnar copy of loan_approval_dataset.csv.
+
+The CSV is converted once into Parquet with stripped column names and
+values, dictionary-encoded (categorical) string columns and narrow integer
+types. Readers load only the columns they need, memory-mapped, and the
+store is rebuilt automatically whenever the CSV is newer than it.
+
+Usage:
+    python -m core.dataset [loan_approval_dataset.csv] [loan_approval_dataset.parquet]
+"""
+import argparse
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.artifacts import DATASET_PATH, registry
+from core.metrics import span
+
+STORE_PATH = 'loan_approval_dataset.parquet'
+
+STRING_COLUMNS = ['education', 'self_employed', 'loan_status']
+
+# Integer widths for the stored columns; anything unlisted stays int64
+INTEGER_DTYPES = {
+    'loan_id': 'int32',
+    'no_of_dependents': 'int8',
+    'income_annum': 'int32',
+    'loan_amount': 'int32',
+    'loan_term': 'int8',
+    'cibil_score': 'int16',
+    'residential_assets_value': 'int32',
+    'commercial_assets_value': 'int32',
+    'luxury_assets_value': 'int32',
+    'bank_asset_value': 'int32',
+}
+
+INGEST_CHUNKSIZE = 500000
+
+_ingest_lock = threading.Lock()
+
+
+def clean_chunk(chunk):
+    chunk.columns = chunk.columns.str.strip()
+    for column in STRING_COLUMNS:
+        if column in chunk.columns:
+            chunk[column] = chunk[column].str.strip()
+    for column, dtype in INTEGER_DTYPES.items():
+        if column in chunk.columns:
+            info = np.iinfo(dtype)
+            values = chunk[column]
+            if values.min() < info.min or values.max() > info.max:
+                raise ValueError(f"{column} does not fit in {dtype}; widen INTEGER_DTYPES")
+            chunk[column] = values.astype(dtype)
+    return chunk
+
+
+def ingest(csv_path=DATASET_PATH, store_path=STORE_PATH, chunksize=INGEST_CHUNKSIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Written to a temporary file of this process and thread, then renamed, so
+    # readers never see a half-written store; when several processes rebuild
+    # it at once, each swaps in a complete copy and the last one wins
+    tmp_path = f'{store_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    writer = None
+    rows = 0
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            table = pa.Table.from_pandas(clean_chunk(chunk), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, use_dictionary=STRING_COLUMNS)
+            writer.write_table(table)
+            rows += len(chunk)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if writer is not None:
+        writer.close()
+    os.replace(tmp_path, store_path)
+    return rows
+
+
+def ensure_store(csv_path=DATASET_PATH, store_path=STORE_PATH):
+    # The lock only saves threads of one process from converting the CSV twice
+    with _ingest_lock:
+        stale = (not os.path.exists(store_path)
+                 or (os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(store_path)))
+        if stale:
+            with span('csv_ingest'):
+                ingest(csv_path, store_path)
+    return store_path
+
+
+def dataset_fingerprint(csv_path=DATASET_PATH, store_path=STORE_PATH):
+    # Changes whenever the store is rebuilt
+    stat = os.stat(ensure_store(csv_path, store_path))
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+
+def read_columns(path, columns=None):
+    import pyarrow.parquet as pq
+
+    schema_names = pq.read_schema(path).names
+    columns = list(columns) if columns is not None else schema_names
+    dictionary_columns = [column for column in STRING_COLUMNS if column in columns]
+    table = pq.read_table(path, columns=columns, memory_map=True, read_dictionary=dictionary_columns)
+    return table.to_pandas()
+
+
+_loaders = {}
+
+
+def _column_loader(columns):
+    # One named loader per column set, so the registry caches each set separately
+    loader = _loaders.get(columns)
+    if loader is None:
+        def loader(path):
+            return read_columns(path, columns)
+        loader.__name__ = f"read_columns[{','.join(columns) if columns else '*'}]"
+        loader = _loaders.setdefault(columns, loader)
+    return loader
+
+
+def load_columns(columns=None, csv_path=DATASET_PATH, store_path=STORE_PATH):
+    store_path = ensure_store(csv_path, store_path)
+    return registry.get(store_path, _column_loader(tuple(columns) if columns is not None else None))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert the loan CSV into the columnar store.')
+    parser.add_argument('csv', nargs='?', default=DATASET_PATH)
+    parser.add_argument('store', nargs='?', default=STORE_PATH)
+    parser.add_argument('--chunksize', type=int, default=INGEST_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    rows = ingest(args.csv, args.store, args.chunksize)
+    print(f"Wrote {rows} rows to {args.store} ({os.path.getsize(args.store):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Derived columns (income ranges and brackets) computed once per dataset version.
+
+Brackets are assigned once as int8 codes (-1 for values outside every bin).
+Callers get read-only code arrays or categoricals over them, so no column is
+re-allocated per click and sessions sharing a process never write shared
+DataFrames.
+"""
+import numpy as np
+import pandas as pd
+
+from core.artifacts import DATASET_PATH, registry
+from core.dataset import ensure_store, read_columns
+
+INCOME_RANGE_BINS = [0, 100000, 300000, 500000, 800000, 1000000,
+                     2000000, 3000000, 4000000, 5000000]
+INCOME_RANGE_LABELS = ['<1L', '1-3L', '3-5L', '5-8L', '8-10L',
+                       '10-20L', '20-30L', '30-40L', '40-50L', '50L+']
+
+INCOME_BRACKET_BINS = [0, 500000, 1000000, 2000000, 3000000, 5000000, 10000000]
+INCOME_BRACKET_LABELS = ["0-5L", "5k-10L", "10k-20L", "20k-30L", "30-50L", "50L+"]
+
+
+BRACKET_LABELS = {
+    'income_range': INCOME_RANGE_LABELS,
+    'income_bracket': INCOME_BRACKET_LABELS,
+}
+
+
+def bracket_bins(income_max):
+    # Bin edges of each derived column; the last income range ends at the data maximum
+    return {
+        'income_range': INCOME_RANGE_BINS + [income_max],
+        'income_bracket': INCOME_BRACKET_BINS,
+    }
+
+
+def bracket_codes(values, bins):
+    # Same right-closed intervals as pd.cut, without building Interval objects
+    values = np.asarray(values)
+    codes = np.searchsorted(bins, values, side='left') - 1
+    codes[(values <= bins[0]) | (values > bins[-1])] = -1
+    codes = codes.astype(np.int8)
+    codes.flags.writeable = False
+    return codes
+
+
+class DerivedFeatures:
+
+    def __init__(self, codes, labels):
+        self._codes = codes
+        self._labels = labels
+
+    @classmethod
+    def from_income(cls, income):
+        income = np.asarray(income)
+        bins = bracket_bins(income.max())
+        return cls({name: bracket_codes(income, edges) for name, edges in bins.items()}, BRACKET_LABELS)
+
+    def names(self):
+        return list(self._codes)
+
+    def codes(self, name):
+        return self._codes[name]
+
+    def categorical(self, name, index=None):
+        values = pd.Categorical.from_codes(self._codes[name], categories=self._labels[name], ordered=True)
+        return pd.Series(values, index=index, name=name)
+
+    def columns(self, index=None):
+        return {name: self.categorical(name, index) for name in self._codes}
+
+
+def read_derived(path):
+    return DerivedFeatures.from_income(read_columns(path, ['income_annum'])['income_annum'])
+
+
+def load_derived(csv_path=DATASET_PATH):
+    # Memoized per store version in the process-wide registry
+    return registry.get(ensure_store(csv_path), read_derived)
@@ -0,0 +1,420 @@
+"""Drift monitoring of scored traffic against the training data.
+
+The reference profile bins every input of df1.pkl once: numeric features into
+at most BINS quantile bins (one bin per value when there are fewer distinct
+values), with open outer bins so every value has one, and categorical
+features into their schema vocabulary plus an "other" bin. Scored traffic is
+counted into the same bins, together with its approved/rejected predictions,
+as one flat integer array per time slot: observing a batch is a searchsorted
+and one bincount, and no rows are kept. The slots of the last WINDOW_SECONDS
+form the window compared with the reference:
+
+    psi            population stability index over the bins; above 0.1 is a
+                   moderate shift and above 0.25 a significant one
+    ks             largest gap between the binned CDFs of a numeric feature,
+                   with its asymptotic p-value
+    approval rate  predicted approval rate against the training labels' rate
+
+Every scoring process (API worker, Prediction page, stream ingester) keeps its
+own monitor, and a background thread writes its slots to a small JSON file in
+LOAN_DRIFT_DIR every few seconds after new traffic. Slots are aligned on
+wall-clock time, so the Drift page adds the files up into one window. Files
+last written before the window began, files of processes on this host that
+have exited, and the oldest files beyond MAX_STATE_FILES are deleted whenever
+a monitor starts or the window is read.
+
+Usage:
+    python -m core.drift            # report on the current window
+
+Environment:
+    LOAN_DRIFT          1 (default) to monitor scored traffic, 0 to disable
+    LOAN_DRIFT_DIR      directory of the per-process state files (default drift)
+    LOAN_DRIFT_WINDOW   window length in seconds (default 3600)
+    LOAN_DRIFT_SLOTS    slots per window (default 12)
+"""
+import argparse
+import atexit
+import glob
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.artifacts import REFERENCE_PATH, registry, unpickle
+from core.schema import CATEGORICAL, FEATURES, SCHEMA, TARGET
+
+logger = logging.getLogger(__name__)
+
+DRIFT_DIR = os.environ.get('LOAN_DRIFT_DIR', 'drift')
+WINDOW_SECONDS = float(os.environ.get('LOAN_DRIFT_WINDOW', 3600))
+WINDOW_SLOTS = int(os.environ.get('LOAN_DRIFT_SLOTS', 12))
+FLUSH_SECONDS = 5.0
+# State files kept at most; the least recently written beyond it are deleted
+MAX_STATE_FILES = 64
+
+BINS = 20
+# Share given to empty bins, so the PSI of a bin seen on one side only stays finite
+EPSILON = 1e-4
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+
+def _numeric_bins(values, max_bins):
+    # (inner edges, labels); a value falls in the bin after the last edge <= it
+    distinct = np.unique(values)
+    if len(distinct) <= max_bins:
+        edges = (distinct[:-1] + distinct[1:]) / 2
+        return edges, [f'{value:,.0f}' for value in distinct]
+    edges = np.unique(np.quantile(values, np.arange(1, max_bins) / max_bins))
+    bounds = [f'{edge:,.0f}' for edge in edges]
+    labels = [f'< {bounds[0]}'] + [f'{low} to {high}' for low, high in zip(bounds[:-1], bounds[1:])]
+    return edges, labels + [f'>= {bounds[-1]}']
+
+
+class ReferenceProfile:
+    """Fixed bins of every feature, and the training data's counts in them."""
+
+    def __init__(self, bins, labels, reference, approval_rate):
+        # bins: {feature: inner edges (numeric) or categories (categorical)}
+        self.bins = bins
+        self.labels = labels
+        self.slices = {}
+        start = 0
+        for feature in FEATURES:
+            self.slices[feature] = slice(start, start + len(labels[feature]))
+            start += len(labels[feature])
+        # Rejected and approved predictions
+        self.approval = slice(start, start + 2)
+        self.size = start + 2
+        self.reference = reference
+        self.approval_rate = approval_rate
+        # Any accepted spelling of a category (df1.pkl keeps the dataset's, ' Graduate') to its bin
+        self._codes = {}
+        for feature in CATEGORICAL:
+            codes = {category: code for code, category in enumerate(bins[feature])}
+            self._codes[feature] = {alias: codes[category] for alias, category in SCHEMA[feature].lookup.items()
+                                    if category in codes}
+        spec = {feature: np.asarray(bins[feature]).tolist() for feature in FEATURES}
+        self.fingerprint = hashlib.sha1(json.dumps(spec).encode()).hexdigest()[:16]
+
+    @classmethod
+    def from_frame(cls, frame, approval_rate, max_bins=BINS):
+        bins, labels = {}, {}
+        for feature in FEATURES:
+            if feature in CATEGORICAL:
+                bins[feature] = list(SCHEMA[feature].vocabulary)
+                labels[feature] = bins[feature] + ['other']
+            else:
+                bins[feature], labels[feature] = _numeric_bins(frame[feature].to_numpy(dtype=float), max_bins)
+        profile = cls(bins, labels, None, approval_rate)
+        profile.reference = profile.counts(frame)
+        return profile
+
+    def counts(self, columns, predictions=None):
+        # Flat bin counts of a batch; `columns` maps each feature to its values
+        # (a DataFrame, or a dict of lists straight from JSON records)
+        indices = []
+        for feature in FEATURES:
+            start = self.slices[feature].start
+            if feature in CATEGORICAL:
+                lookup = self._codes[feature]
+                other = len(self.bins[feature])
+                codes = np.fromiter((lookup.get(str(value).strip().lower(), other) for value in columns[feature]),
+                                    dtype=np.int64)
+            else:
+                codes = np.searchsorted(self.bins[feature], np.asarray(columns[feature], dtype=float), side='right')
+            indices.append(codes + start)
+        if predictions is not None:
+            indices.append(self.approval.start + (np.asarray(predictions) == 1))
+        return np.bincount(np.concatenate(indices), minlength=self.size)
+
+
+def reference_approval_rate():
+    from core.dataset import load_columns
+
+    return float((load_columns([TARGET])[TARGET].astype(str).str.strip() == 'Approved').mean())
+
+
+def _profile_loader(path):
+    return ReferenceProfile.from_frame(unpickle(path), reference_approval_rate())
+
+
+def load_reference_profile(path=REFERENCE_PATH):
+    # Rebuilt only when df1.pkl changes
+    return registry.get(path, _profile_loader)
+
+
+def psi(expected, actual):
+    expected = np.maximum(expected / max(expected.sum(), 1), EPSILON)
+    actual = np.maximum(actual / max(actual.sum(), 1), EPSILON)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def ks_statistic(expected, actual):
+    # Exact at the bin edges, so a lower bound of the unbinned statistic
+    return float(np.abs(np.cumsum(expected) / max(expected.sum(), 1)
+                        - np.cumsum(actual) / max(actual.sum(), 1)).max())
+
+
+def ks_pvalue(statistic, n, m):
+    # Asymptotic Kolmogorov distribution with the usual small-sample correction
+    if not n or not m:
+        return np.nan
+    effective = np.sqrt(n * m / (n + m))
+    lam = (effective + 0.12 + 0.11 / effective) * statistic
+    if lam < 0.2:
+        return 1.0
+    k = np.arange(1, 101)
+    return float(np.clip(2 * np.sum((-1.0) ** (k - 1) * np.exp(-2 * k * k * lam * lam)), 0, 1))
+
+
+def drift_status(value):
+    if np.isnan(value):
+        return 'no data'
+    if value > PSI_SIGNIFICANT:
+        return 'significant'
+    return 'moderate' if value > PSI_MODERATE else 'stable'
+
+
+def feature_drift(profile, counts):
+    # One row per feature: rows in the window, PSI, KS and its p-value, status
+    rows = []
+    for feature in FEATURES:
+        expected = profile.reference[profile.slices[feature]]
+        actual = counts[profile.slices[feature]]
+        n = int(actual.sum())
+        value = psi(expected, actual) if n else np.nan
+        numeric = feature not in CATEGORICAL
+        ks = ks_statistic(expected, actual) if n and numeric else np.nan
+        rows.append({
+            'feature': feature,
+            'rows': n,
+            'psi': value,
+            'ks': ks,
+            'ks_pvalue': ks_pvalue(ks, n, int(expected.sum())) if n and numeric else np.nan,
+            'status': drift_status(value),
+        })
+    return pd.DataFrame(rows).set_index('feature')
+
+
+def approval_drift(profile, counts):
+    rejected, approved = counts[profile.approval]
+    n = int(rejected + approved)
+    rate = approved / n if n else np.nan
+    expected = profile.approval_rate
+    # Standard score of the window's rate under the reference rate
+    z = (rate - expected) / np.sqrt(expected * (1 - expected) / n) if n and 0 < expected < 1 else np.nan
+    return {'rows': n, 'rate': float(rate), 'reference_rate': expected, 'difference': float(rate - expected),
+            'z': float(z)}
+
+
+def bin_shares(profile, counts, feature):
+    # Share of the reference and of the window in each bin of `feature`
+    expected = profile.reference[profile.slices[feature]]
+    actual = counts[profile.slices[feature]]
+    return pd.DataFrame({'reference': expected / max(expected.sum(), 1), 'window': actual / max(actual.sum(), 1)},
+                        index=pd.Index(profile.labels[feature], name=feature))
+
+
+class DriftMonitor:
+    """Time-slotted bin counts of the traffic scored by this process."""
+
+    def __init__(self, profile, window_seconds=WINDOW_SECONDS, slots=WINDOW_SLOTS, path=None):
+        self.profile = profile
+        self.slot_seconds = window_seconds / slots
+        self.slots = slots
+        self.path = path
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty = False
+        self._thread = None
+
+    def _expire(self, slot):
+        for old in [old for old in self._counts if old <= slot - self.slots]:
+            del self._counts[old]
+
+    def observe(self, columns, predictions, now=None):
+        now = time.time() if now is None else now
+        counts = self.profile.counts(columns, predictions)
+        slot = int(now // self.slot_seconds)
+        with self._lock:
+            if slot in self._counts:
+                self._counts[slot] += counts
+            else:
+                self._counts[slot] = counts
+                self._expire(slot)
+            self._dirty = True
+
+    def snapshot(self):
+        with self._lock:
+            return {slot: counts.copy() for slot, counts in self._counts.items()}
+
+    def flush(self):
+        # Written atomically so the Drift page never reads a half-written file
+        with self._flush_lock:
+            self._dirty = False
+            state = {
+                'fingerprint': self.profile.fingerprint,
+                'slot_seconds': self.slot_seconds,
+                'updated_at': time.time(),
+                'slots': {str(slot): counts.tolist() for slot, counts in self.snapshot().items()},
+            }
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump(state, file)
+            os.replace(tmp_path, self.path)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_SECONDS)
+            if self._dirty:
+                try:
+                    self.flush()
+                except OSError:
+                    logger.exception('could not write %s', self.path)
+
+    def start(self):
+        # Flushes in the background, so observing never writes to disk
+        if self._thread is None and self.path is not None:
+            self._thread = threading.Thread(target=self._flush_loop, name='drift-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(lambda: self._dirty and self.flush())
+        return self
+
+
+def _read_state(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def _process_alive(path):
+    # Only the pid in a state file of this host can be checked; others count as alive
+    host, _, pid = os.path.splitext(os.path.basename(path))[0].rpartition('-')
+    if os.name != 'posix' or host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def prune_states(directory=DRIFT_DIR, window_seconds=WINDOW_SECONDS, max_files=MAX_STATE_FILES, now=None):
+    # Deletes the state files with nothing left in the window (last written
+    # before it began), those of exited processes of this host and the oldest
+    # beyond max_files, and forgets them in the registry; returns the rest
+    now = time.time() if now is None else now
+    kept, removed = [], []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        if mtime < now - window_seconds or not _process_alive(path):
+            removed.append(path)
+        else:
+            kept.append((mtime, path))
+    kept.sort(reverse=True)
+    removed += [path for _, path in kept[max_files:]]
+    for path in removed:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        registry.forget(path)
+    return [path for _, path in kept[:max_files]]
+
+
+def load_slots(profile, directory=DRIFT_DIR, window_seconds=WINDOW_SECONDS, slots=WINDOW_SLOTS, now=None):
+    # {slot start time: bin counts} of the window, summed over every process's state file
+    now = time.time() if now is None else now
+    slot_seconds = window_seconds / slots
+    first = int(now // slot_seconds) - slots + 1
+    total = {}
+    for path in prune_states(directory, window_seconds, now=now):
+        try:
+            state = registry.get(path, _read_state)
+        except (OSError, ValueError):
+            continue
+        # Written against other bins (an older df1.pkl) or another slot length
+        if state['fingerprint'] != profile.fingerprint or state['slot_seconds'] != slot_seconds:
+            continue
+        for slot, counts in state['slots'].items():
+            slot = int(slot)
+            if slot >= first:
+                counts = np.asarray(counts, dtype=np.int64)
+                total[slot] = total[slot] + counts if slot in total else counts
+    return {slot * slot_seconds: counts for slot, counts in sorted(total.items())}
+
+
+def window_counts(profile, slot_counts):
+    return sum(slot_counts.values(), np.zeros(profile.size, dtype=np.int64))
+
+
+def trend(profile, slot_counts, feature=None):
+    # Approval rate (and the PSI of `feature`) per slot, indexed by slot start time
+    rows = {}
+    for start, counts in slot_counts.items():
+        row = {'approval_rate': approval_drift(profile, counts)['rate']}
+        if feature is not None:
+            row[f'psi_{feature}'] = feature_drift(profile, counts).loc[feature, 'psi']
+        rows[pd.Timestamp(start, unit='s')] = row
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_monitor():
+    # One monitor per process, or None with LOAN_DRIFT=0
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                if os.environ.get('LOAN_DRIFT', '1') == '0':
+                    _monitor = False
+                else:
+                    # Files left behind by earlier processes are cleared before this one adds its own
+                    prune_states()
+                    path = os.path.join(DRIFT_DIR, f'{socket.gethostname()}-{os.getpid()}.json')
+                    _monitor = DriftMonitor(load_reference_profile(), path=path).start()
+    return _monitor or None
+
+
+def observe(columns, predictions):
+    # Counts a scored batch; drift monitoring never fails the request it observes
+    try:
+        monitor = get_monitor()
+        if monitor is not None:
+            monitor.observe(columns, predictions)
+    except Exception:
+        logger.exception('drift monitoring failed')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report drift of the scored traffic against the training data.')
+    parser.add_argument('--dir', default=DRIFT_DIR)
+    args = parser.parse_args(argv)
+
+    profile = load_reference_profile()
+    counts = window_counts(profile, load_slots(profile, args.dir))
+    approval = approval_drift(profile, counts)
+    print(f"{approval['rows']} applications in the last {WINDOW_SECONDS / 60:.0f} minutes; approval rate "
+          f"{approval['rate']:.1%} (training data {approval['reference_rate']:.1%})")
+    if approval['rows']:
+        print(feature_drift(profile, counts).to_string(float_format=lambda value: f'{value:.4f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Export an inference-only copy of pipeline.pkl.
+
+The training pipeline carries the SMOTE oversampler together with its fitted
+NearestNeighbors/KDTree state. Resamplers are skipped at predict time, so the
+exported artifact keeps only the preprocessor and the RandomForest, stored
+uncompressed with joblib so its numpy arrays can be memory-mapped on load.
+
+Usage:
+    python -m core.export                 # write pipeline_inference.joblib
+    python -m core.export --compare       # load time / RSS of both artifacts
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from core.artifacts import INFERENCE_PATH, MODEL_PATH, REFERENCE_PATH, unpickle
+
+
+def slim_pipeline(pipeline):
+    # Keep every step that transforms or predicts; drop the resamplers
+    steps = [(name, step) for name, step in pipeline.steps
+             if not hasattr(step, 'fit_resample')]
+    return Pipeline(steps)
+
+
+def export_inference_pipeline(src=MODEL_PATH, dst=INFERENCE_PATH, reference=REFERENCE_PATH):
+    pipeline = unpickle(src)
+    slim = slim_pipeline(pipeline)
+
+    # The exported model must score exactly like the original one
+    if reference and os.path.exists(reference):
+        X = unpickle(reference)
+        if not np.array_equal(pipeline.predict_proba(X), slim.predict_proba(X)):
+            raise ValueError(f"{dst} would not reproduce the predictions of {src}")
+
+    # Renamed into place, so processes hot-reloading the artifact never read half of it
+    tmp_path = f'{dst}.{os.getpid()}.tmp'
+    joblib.dump(slim, tmp_path, compress=0)
+    os.replace(tmp_path, dst)
+    return dst
+
+
+_MEASURE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+
+def rss():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+import sklearn.ensemble, sklearn.compose, pandas
+from core.artifacts import load_model_file
+before = rss()
+start = time.perf_counter()
+load_model_file({path!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'rss_bytes': rss() - before}}))
+"""
+
+
+def measure(path):
+    # Each artifact is loaded in a fresh interpreter so RSS deltas are comparable
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = _MEASURE.format(root=root, path=path)
+    output = subprocess.run([sys.executable, '-c', code], check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['path'] = path
+    result['size_bytes'] = os.path.getsize(path)
+    return result
+
+
+def compare(paths=(MODEL_PATH, INFERENCE_PATH), repeat=3):
+    results = []
+    for path in paths:
+        runs = [measure(path) for _ in range(repeat)]
+        best = min(runs, key=lambda run: run['seconds'])
+        results.append(best)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export an inference-only pipeline artifact.')
+    parser.add_argument('--src', default=MODEL_PATH)
+    parser.add_argument('--dst', default=INFERENCE_PATH)
+    parser.add_argument('--compare', action='store_true',
+                        help='report load time and RSS of the original and exported artifacts')
+    args = parser.parse_args(argv)
+
+    if not args.compare or not os.path.exists(args.dst):
+        export_inference_pipeline(args.src, args.dst)
+        print(f"Wrote {args.dst} ({os.path.getsize(args.dst):,} bytes)")
+
+    if args.compare:
+        for result in compare((args.src, args.dst)):
+            print(f"{result['path']:<28} size {result['size_bytes'] / 1e6:6.2f} MB  "
+                  f"load {result['seconds'] * 1000:7.1f} ms  "
+                  f"RSS +{result['rss_bytes'] / 1e6:6.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Cache of rendered Analysis figures.
+
+Figures depend only on the dataset version and the view parameters, so the
+PNG bytes are cached under (dataset fingerprint, view, parameters): first in
+a per-process LRU, then in an on-disk LRU directory shared by every worker.
+Both tiers are capped in bytes; a refreshed dataset simply changes the
+fingerprint and the old entries age out.
+
+Usage:
+    python -m core.figcache --warm     # pre-render every view after a data refresh
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from core.dataset import dataset_fingerprint
+from core.metrics import inc, span
+
+CACHE_DIR = os.environ.get('LOAN_FIGURE_CACHE', '.figure_cache')
+MEMORY_BYTES = 64 * 1024 * 1024
+DISK_BYTES = 512 * 1024 * 1024
+
+# Bump when the drawing code changes so stale figures are not served
+RENDER_VERSION = 3
+
+# Same output as st.pyplot
+SAVEFIG_OPTIONS = {'bbox_inches': 'tight', 'dpi': 200, 'format': 'png'}
+
+
+def cache_key(fingerprint, view, params):
+    raw = json.dumps([RENDER_VERSION, fingerprint, view, params], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def figure_bytes(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, **SAVEFIG_OPTIONS)
+    return buffer.getvalue()
+
+
+class FigureCache:
+
+    def __init__(self, directory=CACHE_DIR, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.png')
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as file:
+                    data = file.read()
+                # Touch the file so disk eviction is least-recently-used
+                os.utime(path)
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                with self._lock:
+                    self.hits += 1
+                return data
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.png'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def render(self, fingerprint, view, params, draw):
+        key = cache_key(fingerprint, view, params)
+        data = self.get(key)
+        inc('loan_figure_cache_requests_total', result='miss' if data is None else 'hit')
+        if data is None:
+            with span(f'render.{view}'):
+                data = figure_bytes(draw())
+            self.put(key, data)
+        return data
+
+
+cache = FigureCache()
+
+
+def render_view(name, **params):
+    def draw():
+        # Plotting libraries are only imported when a figure must be drawn
+        from core.views import VIEWS
+
+        return VIEWS[name](**params)
+
+    return cache.render(dataset_fingerprint(), name, params, draw)
+
+
+def warm(log=print):
+    from core.views import all_views
+
+    start = time.perf_counter()
+    count = 0
+    for name, params in all_views():
+        render_view(name, **params)
+        count += 1
+    if log is not None:
+        log(f"Rendered {count} views in {time.perf_counter() - start:.1f}s into {cache.directory}")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the rendered-figure cache.')
+    parser.add_argument('--warm', action='store_true', help='pre-render every Analysis view')
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use('Agg')
+    if args.warm:
+        warm()
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
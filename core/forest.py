@@ -0,0 +1,343 @@
+"""Flattened RandomForest inference.
+
+RandomForestClassifier.predict_proba dispatches one Cython call per tree and
+validates its input through several layers, which dominates single-row
+latency. FlatForest copies the fitted trees into contiguous NumPy node arrays
+and walks all trees for a block of rows at once, level by level. The
+preprocessor (OrdinalEncoder + StandardScaler) is applied with plain NumPy as
+well. Probabilities are accumulated tree by tree in the same order and with
+the same float operations as scikit-learn, so results are bit-identical to
+pipeline.predict_proba.
+
+The level-by-level walk wins for the small batches the app and the API send;
+beyond FLAT_MAX_ROWS the per-level NumPy overhead loses to scikit-learn's
+compiled per-tree traversal, so large batches go to the fitted forest on the
+NumPy-preprocessed matrix instead.
+
+explain() attributes each approval probability to the input columns
+(Saabas-style path attribution): every node stores the contribution of the
+splits on its root path, computed once from the node probabilities, so an
+explanation is one leaf lookup per tree. The encoded features the trees split
+on are mapped back to the original columns through the preprocessor.
+
+Usage:
+    python -m core.forest --benchmark
+"""
+import argparse
+import os
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from core.artifacts import default_model_path, load_model_file, load_reference_frame, reference_path_for, registry
+from core.schema import FEATURES, model_vocabulary, normalize_frame
+
+# Largest batch walked by FlatForest itself (measured crossover ~700 rows)
+FLAT_MAX_ROWS = 512
+
+
+class _NumpyPreprocessor:
+    """Exact NumPy equivalent of a ColumnTransformer(OrdinalEncoder, StandardScaler)."""
+
+    def __init__(self, preprocessor):
+        from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+        self.steps = []
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop' or name == 'remainder':
+                continue
+            if isinstance(transformer, OrdinalEncoder):
+                unknown = transformer.unknown_value if transformer.handle_unknown == 'use_encoded_value' else None
+                lookups = [{category: float(code) for code, category in enumerate(categories)}
+                           for categories in transformer.categories_]
+                self.steps.append(('ordinal', list(columns), (lookups, unknown)))
+            elif isinstance(transformer, StandardScaler):
+                mean = transformer.mean_ if transformer.with_mean else None
+                scale = transformer.scale_ if transformer.with_std else None
+                self.steps.append(('scale', list(columns), (mean, scale)))
+            else:
+                raise TypeError(f'unsupported transformer {type(transformer).__name__}')
+
+    @classmethod
+    def supports(cls, preprocessor):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+        return (isinstance(preprocessor, ColumnTransformer)
+                and getattr(preprocessor, 'remainder', 'drop') == 'drop'
+                and all(isinstance(t, (OrdinalEncoder, StandardScaler)) or t == 'drop' or name == 'remainder'
+                        for name, t, _ in preprocessor.transformers_))
+
+    def transform(self, df):
+        blocks = []
+        for kind, columns, params in self.steps:
+            if kind == 'ordinal':
+                lookups, unknown = params
+                block = np.empty((len(df), len(columns)))
+                for k, (column, lookup) in enumerate(zip(columns, lookups)):
+                    codes = df[column].map(lookup)
+                    if codes.isna().any():
+                        if unknown is None:
+                            raise ValueError(f'unknown categories in {column}')
+                        codes = codes.fillna(unknown)
+                    block[:, k] = codes.to_numpy(dtype=float)
+            else:
+                mean, scale = params
+                block = df[columns].to_numpy(dtype=float, copy=True)
+                if mean is not None:
+                    block -= mean
+                if scale is not None:
+                    block /= scale
+            blocks.append(block)
+        return np.hstack(blocks)
+
+
+def _encoded_columns(preprocessor):
+    # Input column behind each encoded feature, in the order the trees see them
+    from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+    columns = []
+    for name, transformer, selected in preprocessor.transformers_:
+        if transformer == 'drop' or name == 'remainder':
+            continue
+        selected = list(selected)
+        if isinstance(transformer, (OrdinalEncoder, StandardScaler)):
+            columns += selected
+        elif hasattr(transformer, 'categories_') and getattr(transformer, 'drop_idx_', None) is None:
+            # One-hot style: one output per category of each column
+            for column, categories in zip(selected, transformer.categories_):
+                columns += [column] * len(categories)
+        else:
+            return None
+    return columns
+
+
+class FlatForest:
+
+    def __init__(self, preprocessor, left, right, feature, threshold, proba, roots, classes, forest=None,
+                 vocabulary=None, columns=None):
+        self.preprocessor = preprocessor
+        self.vocabulary = vocabulary
+        self.columns = columns
+        self.forest = forest
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.proba = proba
+        self.roots = roots
+        self.classes_ = classes
+        self.internal = left != np.arange(len(left))
+        self._paths = None
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        steps = [step for _, step in pipeline.steps if not hasattr(step, 'fit_resample')]
+        *transformers, forest = steps
+        if len(transformers) != 1:
+            raise TypeError('expected one preprocessing step before the forest')
+        preprocessor = transformers[0]
+        # scikit-learn is only imported here, once a model is being compiled
+        from sklearn.compose import ColumnTransformer
+
+        columns = _encoded_columns(preprocessor) if isinstance(preprocessor, ColumnTransformer) else None
+        if _NumpyPreprocessor.supports(preprocessor):
+            preprocessor = _NumpyPreprocessor(preprocessor)
+
+        lefts, rights, features, thresholds, probas, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            left = tree.children_left.astype(np.int64)
+            right = tree.children_right.astype(np.int64)
+            leaf = left == -1
+            # Leaves point at themselves, which marks them as leaves
+            nodes = np.arange(tree.node_count) + offset
+            lefts.append(np.where(leaf, nodes, left + offset))
+            rights.append(np.where(leaf, nodes, right + offset))
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(tree.threshold)
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :forest.n_classes_]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(value / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(preprocessor, np.concatenate(lefts), np.concatenate(rights), np.concatenate(features),
+                   np.concatenate(thresholds), np.concatenate(probas), np.array(roots), forest.classes_, forest,
+                   model_vocabulary(pipeline), columns)
+
+    def _leaves(self, X):
+        # Walk every (row, tree) pair level by level, dropping pairs as soon
+        # as they reach a leaf so deep trees do not keep finished rows busy
+        n_trees = len(self.roots)
+        nodes = np.tile(self.roots, len(X))
+        active = np.flatnonzero(self.internal[nodes])
+        while active.size:
+            current = nodes[active]
+            go_left = X[active // n_trees, self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[self.internal[current]]
+        return nodes.reshape(len(X), n_trees)
+
+    def predict_proba(self, df):
+        # Trees compare float32 features against float64 thresholds, as sklearn does
+        X = np.asarray(self.preprocessor.transform(df), dtype=np.float32)
+        if len(X) > FLAT_MAX_ROWS and self.forest is not None:
+            return self.forest.predict_proba(X)
+        leaves = self._leaves(X)
+        out = np.zeros((len(X), self.proba.shape[1]))
+        for t in range(leaves.shape[1]):
+            out += self.proba[leaves[:, t]]
+        out /= len(self.roots)
+        return out
+
+    def predict(self, df):
+        return self.classes_.take(np.argmax(self.predict_proba(df), axis=1), axis=0)
+
+    @property
+    def approved_index(self):
+        # Column of the approval probability (class 1), as score_frame reports it
+        approved = np.flatnonzero(self.classes_ == 1)
+        return approved[0] if len(approved) else len(self.classes_) - 1
+
+    def path_contributions(self):
+        # Per node: approval-probability change from each split on its root path,
+        # filled top-down one tree level at a time and kept for later calls
+        if self._paths is None:
+            proba = self.proba[:, self.approved_index]
+            paths = np.zeros((len(self.left), int(self.feature.max()) + 1))
+            frontier = self.roots[self.internal[self.roots]]
+            while frontier.size:
+                split = self.feature[frontier]
+                for children in (self.left[frontier], self.right[frontier]):
+                    paths[children] = paths[frontier]
+                    paths[children, split] += proba[children] - proba[frontier]
+                frontier = np.concatenate([self.left[frontier], self.right[frontier]])
+                frontier = frontier[self.internal[frontier]]
+            self._paths = paths
+        return self._paths
+
+    def explain(self, df):
+        # (bias, contributions): the approval probability of each row equals
+        # bias + its contributions summed over the original input columns
+        if self.columns is None:
+            raise TypeError('explanations need a column-wise preprocessor')
+        # Categories spelled as the encoder expects (' Graduate'), whatever the caller passed;
+        # a canonical 'Graduate' would otherwise be explained as an unknown category
+        df = normalize_frame(df, self.vocabulary)
+        X = np.asarray(self.preprocessor.transform(df), dtype=np.float32)
+        if len(X) > FLAT_MAX_ROWS and self.forest is not None:
+            leaves = self.forest.apply(X) + self.roots
+        else:
+            leaves = self._leaves(X)
+        paths = self.path_contributions()
+        encoded = np.zeros((len(X), paths.shape[1]))
+        for t in range(leaves.shape[1]):
+            encoded += paths[leaves[:, t]]
+        encoded /= len(self.roots)
+
+        # Encoded features of one input column (e.g. one-hot outputs) are summed;
+        # inputs the model does not use keep a zero contribution
+        names = FEATURES + [column for column in dict.fromkeys(self.columns) if column not in FEATURES]
+        mapping = np.zeros((encoded.shape[1], len(names)))
+        mapping[np.arange(encoded.shape[1]), [names.index(column) for column in self.columns[:encoded.shape[1]]]] = 1
+        contributions = pd.DataFrame(encoded @ mapping, index=df.index, columns=names)
+        bias = self.proba[self.roots, self.approved_index].mean()
+        return bias, contributions
+
+
+_explainers = weakref.WeakKeyDictionary()
+
+
+def explainer(scorer):
+    # The scorer itself when it is a FlatForest, else one flattened from the pipeline (built once)
+    if isinstance(scorer, FlatForest):
+        return scorer
+    forest = _explainers.get(scorer)
+    if forest is None:
+        forest = _explainers[scorer] = FlatForest.from_pipeline(scorer)
+    return forest
+
+
+def compile_model(path):
+    # Built from the model file and checked against the frame it was trained
+    # on (see reference_path_for); a mismatch falls back to the sklearn pipeline
+    pipeline = load_model_file(path)
+    try:
+        forest = FlatForest.from_pipeline(pipeline)
+    except (TypeError, AttributeError, ValueError):
+        return pipeline
+    # Checked on a batch small enough to take the flat walk, and on the full frame
+    reference = load_reference_frame(reference_path_for(path))
+    for sample in (reference.head(FLAT_MAX_ROWS), reference):
+        if not np.array_equal(forest.predict_proba(sample), pipeline.predict_proba(sample)):
+            return pipeline
+    return forest
+
+
+def scorer_loader():
+    # The flattened forest unless LOAN_FAST_FOREST=0
+    return load_model_file if os.environ.get('LOAN_FAST_FOREST', '1') == '0' else compile_model
+
+
+def load_scorer(path=None):
+    # Without a path, the model currently served (see core.models)
+    if path is None:
+        from core.models import current_model
+
+        return current_model().scorer
+    return registry.get(path, scorer_loader())
+
+
+def _time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(sizes=(1, 100, 100000), path=None):
+    pipeline = load_model_file(path or default_model_path())
+    forest = FlatForest.from_pipeline(pipeline)
+    reference = load_reference_frame()
+    results = []
+    for size in sizes:
+        X = reference.sample(n=size, replace=size > len(reference), random_state=0).reset_index(drop=True)
+        identical = np.array_equal(pipeline.predict_proba(X), forest.predict_proba(X))
+        repeat = 20 if size <= 100 else 3
+        results.append({
+            'rows': size,
+            'sklearn_ms': _time(lambda: pipeline.predict_proba(X), repeat) * 1000,
+            'flat_ms': _time(lambda: forest.predict_proba(X), repeat) * 1000,
+            'identical': identical,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Flattened forest inference.')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='compare latency with pipeline.predict_proba')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 100000])
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args(argv)
+
+    if not args.benchmark:
+        parser.print_help()
+        return
+    print(f"{'rows':>8} {'sklearn ms':>11} {'flat ms':>9} {'speedup':>8} identical")
+    for result in benchmark(args.sizes, args.model):
+        print(f"{result['rows']:>8} {result['sklearn_ms']:>11.2f} {result['flat_ms']:>9.2f} "
+              f"{result['sklearn_ms'] / result['flat_ms']:>7.1f}x {result['identical']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Local load test for the scoring service.
+
+Sends single-application requests from N concurrent keep-alive clients and
+reports p50/p99 latency and throughput per concurrency level. Exits with
+status 1 when a level has no successful request.
+
+Usage:
+    python -m core.loadtest --concurrency 1 8 32 64 --requests 2000
+    python -m core.loadtest --url http://127.0.0.1:8000/predict   # against a running server
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from core.artifacts import load_reference_frame
+from core.schema import FEATURES
+
+
+def sample_payloads(n=1000, seed=0):
+    df = load_reference_frame()[FEATURES]
+    rows = df.sample(n=n, replace=len(df) < n, random_state=seed)
+    return [json.dumps(record).encode() for record in rows.to_dict(orient='records')]
+
+
+def _client(url, payloads, count, latencies, errors):
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    for i in range(count):
+        body = payloads[i % len(payloads)]
+        start = time.perf_counter()
+        try:
+            connection.request('POST', parts.path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                # Only successful requests count towards latency and throughput
+                errors.append(response.status)
+                continue
+        except OSError as exc:
+            errors.append(str(exc))
+            connection.close()
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def run_level(url, payloads, concurrency, total_requests):
+    per_client = max(1, total_requests // concurrency)
+    latencies = []
+    errors = []
+    threads = [
+        threading.Thread(target=_client, args=(url, payloads[i::concurrency] or payloads,
+                                               per_client, latencies, errors))
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+        'p99_ms': float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None,
+        'throughput_rps': len(latencies) / elapsed,
+    }
+
+
+def _format_ms(value):
+    return 'n/a' if value is None else f'{value:.2f}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the scoring service.')
+    parser.add_argument('--url', default=None,
+                        help='endpoint to hit (default: start a local server on --port)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--requests', type=int, default=2000, help='requests per concurrency level')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        from core.service import serve
+
+        server = serve('127.0.0.1', args.port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{args.port}/predict'
+
+    payloads = sample_payloads()
+    # Warm up connections, the model and the batching thread
+    run_level(url, payloads, 1, 20)
+
+    results = [run_level(url, payloads, level, args.requests) for level in args.concurrency]
+    if server is not None:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'concurrency':>11} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>9}")
+        for result in results:
+            print(f"{result['concurrency']:>11} {result['requests']:>9} {result['errors']:>7} "
+                  f"{_format_ms(result['p50_ms']):>8} {_format_ms(result['p99_ms']):>8} "
+                  f"{result['throughput_rps']:>9.1f}")
+    # A level without a single successful request means the service is down or rejecting everything
+    failed = [result['concurrency'] for result in results if not result['requests']]
+    if failed:
+        print(f"No successful requests at concurrency {', '.join(map(str, failed))}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Timing spans, counters and an optional sampling profiler.
+
+Disabled unless LOAN_METRICS=1. When disabled, span() returns one shared
+no-op context manager and inc() returns immediately, so instrumented code
+pays a function call and a flag check. When enabled, span durations are
+kept as Prometheus histograms (loan_span_seconds{span=...}) and, together
+with the counters, exported in the Prometheus text format: on /metrics of
+the API service, or on a small local HTTP server started by the Streamlit
+pages (LOAN_METRICS_PORT, default 9464).
+
+LOAN_PROFILE=1 additionally samples every thread's stack every
+LOAN_PROFILE_INTERVAL seconds (default 0.01) and serves the folded stacks
+on /profile, ready for flamegraph.pl or speedscope.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+ENABLED = os.environ.get('LOAN_METRICS') == '1'
+PROFILE = os.environ.get('LOAN_PROFILE') == '1'
+PORT = int(os.environ.get('LOAN_METRICS_PORT', 9464))
+PROFILE_INTERVAL = float(os.environ.get('LOAN_PROFILE_INTERVAL', 0.01))
+
+# Upper bounds in seconds, from a cached lookup to a cold model load
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_SPAN = nullcontext()
+
+
+class Registry:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * len(self.buckets), 0.0, 0]
+            counts = histogram[0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def inc(self, name, labels, value):
+        with self._lock:
+            self._counters[(name, labels)] += value
+
+    def render(self):
+        # Prometheus text exposition format 0.0.4
+        with self._lock:
+            histograms = {name: (list(counts), total, count)
+                          for name, (counts, total, count) in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        if histograms:
+            lines.append('# HELP loan_span_seconds Duration of instrumented code paths.')
+            lines.append('# TYPE loan_span_seconds histogram')
+            for name, (counts, total, count) in sorted(histograms.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    lines.append(f'loan_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'loan_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+                lines.append(f'loan_span_seconds_sum{{span="{name}"}} {total}')
+                lines.append(f'loan_span_seconds_count{{span="{name}"}} {count}')
+        declared = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in declared:
+                lines.append(f'# TYPE {name} counter')
+                declared.add(name)
+            label_text = ','.join(f'{key}="{val}"' for key, val in labels)
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+registry = Registry()
+
+
+@contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - start)
+
+
+def span(name):
+    # with span('predict'): ...  -- records into loan_span_seconds{span="predict"}
+    if not ENABLED:
+        return _NULL_SPAN
+    return _timed(name)
+
+
+def inc(name, value=1, **labels):
+    if not ENABLED:
+        return
+    registry.inc(name, tuple(sorted(labels.items())), value)
+
+
+def count_session(state, page):
+    # Per-session counters live in Streamlit's session_state; the totals are exported
+    if not ENABLED:
+        return
+    runs = state.setdefault('loan_metrics_runs', Counter())
+    if not runs:
+        inc('loan_sessions_total')
+    runs[page] += 1
+    inc('loan_page_runs_total', page=page)
+
+
+class SamplingProfiler:
+    """Collects folded stacks of every thread at a fixed interval."""
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            samples = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                samples.append(';'.join(reversed(stack)))
+            with self._lock:
+                self.stacks.update(samples)
+
+    def folded(self):
+        with self._lock:
+            items = self.stacks.most_common()
+        return ''.join(f'{stack} {count}\n' for stack, count in items)
+
+
+profiler = SamplingProfiler()
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def wsgi_response(path, start_response):
+    # Body for /metrics or /profile, or None for any other path
+    if path == '/metrics':
+        body = registry.render() if ENABLED else '# metrics disabled, set LOAN_METRICS=1\n'
+        content_type = 'text/plain; version=0.0.4'
+    elif path == '/profile':
+        body = profiler.folded() if PROFILE else '# profiler disabled, set LOAN_PROFILE=1\n'
+        content_type = 'text/plain'
+    else:
+        return None
+    data = body.encode()
+    start_response('200 OK', [('Content-Type', content_type), ('Content-Length', str(len(data)))])
+    return [data]
+
+
+def _not_found(environ, start_response):
+    response = wsgi_response(environ.get('PATH_INFO', ''), start_response)
+    if response is not None:
+        return response
+    start_response('404 Not Found', [('Content-Type', 'text/plain')])
+    return [b'not found\n']
+
+
+def start(port=PORT, host='127.0.0.1'):
+    # Idempotent; starts the profiler and, for Streamlit, the local metrics endpoint
+    global _server
+    if not ENABLED:
+        return None
+    if PROFILE:
+        profiler.start()
+    if port is None:
+        return None
+    with _server_lock:
+        if _server is None:
+            from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+            class QuietHandler(WSGIRequestHandler):
+                def log_message(self, *args):
+                    pass
+
+            try:
+                _server = make_server(host, port, _not_found, handler_class=QuietHandler)
+            except OSError:
+                # Another process (e.g. a second Streamlit worker) already serves this port
+                _server = False
+                return None
+            threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+    return _server or None
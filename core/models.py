@@ -0,0 +1,335 @@
+"""Versioned model registry with background hot swap.
+
+Each published model gets its own directory next to a manifest:
+
+    models/manifest.json         active version, activation history, metadata
+    models/v3/pipeline.pkl       the training pipeline as published
+    models/v3/pipeline_inference.joblib
+    models/v3/df1.pkl            feature frame it was trained on (optional)
+
+and the manifest records, per version, the model's SHA-256, the SHA-256 of
+the training data, its evaluation metrics and parameters.
+
+Processes serve the Deployment returned by current_model(). A watcher thread
+polls the manifest; when the active version changes it loads, verifies and
+warms the new version in the background, then swaps it in with a single
+reference assignment, so requests already running finish on the version they
+started with and the next ones use the new one. The previously served
+version stays loaded, which makes a rollback a swap without any loading.
+Without a manifest the fixed pipeline.pkl / pipeline_inference.joblib paths
+are served as before.
+
+Usage:
+    python -m core.models publish pipeline.pkl --reference df1.pkl --data loan_approval_dataset.csv
+    python -m core.models list
+    python -m core.models activate v1
+    python -m core.models rollback
+
+Environment:
+    LOAN_MODEL_DIR    registry directory (default models)
+    LOAN_MODEL_POLL   seconds between manifest checks (default 5; 0 checks on every call)
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+from core.artifacts import (MANIFEST_NAME, MODEL_DIR, REFERENCE_PATH, active_version, default_model_path,
+                            file_digest, load_reference_frame, read_json, reference_path_for, registry,
+                            version_model_path)
+from core.forest import FLAT_MAX_ROWS, scorer_loader
+from core.metrics import inc, span
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = float(os.environ.get('LOAN_MODEL_POLL', 5))
+
+# Versions kept loaded per process: the one served and the one before it
+KEEP_LOADED = 2
+
+
+class Deployment:
+    """A loaded model and the version tag attached to its predictions."""
+
+    def __init__(self, version, scorer, digest, path, info=None):
+        self.version = version
+        self.scorer = scorer
+        self.digest = digest
+        self.path = path
+        self.info = info or {}
+
+    @property
+    def tag(self):
+        # The registered version, or the model file's hash outside the registry
+        return self.version or f'sha256:{self.digest[:12]}'
+
+
+def manifest_path(directory=MODEL_DIR):
+    return os.path.join(directory, MANIFEST_NAME)
+
+
+def read_manifest(directory=MODEL_DIR):
+    path = manifest_path(directory)
+    if not os.path.exists(path):
+        return {'active': None, 'history': [], 'versions': {}}
+    return read_json(path)
+
+
+def write_manifest(manifest, directory=MODEL_DIR):
+    # Written atomically so watchers never read a half-written manifest
+    os.makedirs(directory, exist_ok=True)
+    path = manifest_path(directory)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+        file.write('\n')
+    os.replace(tmp_path, path)
+
+
+def _next_version(manifest):
+    numbers = [int(version[1:]) for version in manifest['versions']
+               if version.startswith('v') and version[1:].isdigit()]
+    return f'v{max(numbers, default=0) + 1}'
+
+
+def _set_active(manifest, version):
+    if version not in manifest['versions']:
+        raise ValueError(f'unknown model version {version!r}')
+    manifest['active'] = version
+    manifest['history'].append(version)
+
+
+def publish(model_path, reference_path=None, data_path=None, metrics=None, params=None, version=None,
+            activate=True, directory=MODEL_DIR):
+    # Copies the model (and an exported inference artifact) into a new version directory
+    from core.export import export_inference_pipeline
+
+    manifest = read_manifest(directory)
+    version = version or _next_version(manifest)
+    if version in manifest['versions']:
+        raise ValueError(f'model version {version!r} already exists')
+
+    # Built under a temporary name and renamed, so a version directory is always complete
+    target = os.path.join(directory, version)
+    tmp_target = f'{target}.{os.getpid()}.tmp'
+    os.makedirs(tmp_target)
+    try:
+        info = {
+            'version': version,
+            'created_at': time.time(),
+            'model': 'pipeline.pkl',
+            'sha256': file_digest(model_path),
+            'data_sha256': file_digest(data_path) if data_path else None,
+            'metrics': metrics or {},
+            'params': params or {},
+        }
+        shutil.copyfile(model_path, os.path.join(tmp_target, info['model']))
+        if reference_path:
+            info['reference'] = 'df1.pkl'
+            shutil.copyfile(reference_path, os.path.join(tmp_target, info['reference']))
+        info['inference'] = 'pipeline_inference.joblib'
+        export_inference_pipeline(os.path.join(tmp_target, info['model']),
+                                  os.path.join(tmp_target, info['inference']),
+                                  reference_path)
+        os.replace(tmp_target, target)
+    except BaseException:
+        shutil.rmtree(tmp_target, ignore_errors=True)
+        raise
+
+    manifest['versions'][version] = info
+    if activate:
+        _set_active(manifest, version)
+    write_manifest(manifest, directory)
+    return info
+
+
+def activate(version, directory=MODEL_DIR):
+    manifest = read_manifest(directory)
+    _set_active(manifest, version)
+    write_manifest(manifest, directory)
+    return manifest
+
+
+def rollback(directory=MODEL_DIR):
+    # Back to the version that was active before the current one
+    manifest = read_manifest(directory)
+    history = manifest['history']
+    if len(history) < 2:
+        raise ValueError('no earlier version to roll back to')
+    history.pop()
+    manifest['active'] = history[-1]
+    write_manifest(manifest, directory)
+    return manifest
+
+
+def load_version(version, info, directory=MODEL_DIR):
+    path = version_model_path(version, info, directory)
+    with span('model.load'):
+        scorer = registry.get(path, scorer_loader())
+    # Warmed here on the version's own reference frame (the root df1.pkl when
+    # it was published without one), so the first request after the swap pays for neither
+    with span('model.warm'):
+        scorer.predict_proba(load_reference_frame(reference_path_for(path)).head(FLAT_MAX_ROWS))
+        if hasattr(scorer, 'path_contributions'):
+            scorer.path_contributions()
+    return Deployment(version, scorer, info['sha256'], path, info)
+
+
+def model_tag(path):
+    # Version tag of a model file: its registered version, else its hash
+    path = os.path.abspath(path)
+    for version, info in read_manifest().get('versions', {}).items():
+        if os.path.abspath(os.path.join(MODEL_DIR, version)) == os.path.dirname(path):
+            return version
+    return f'sha256:{file_digest(path)[:12]}'
+
+
+class ModelManager:
+
+    def __init__(self, directory=MODEL_DIR, poll=POLL_SECONDS):
+        self.directory = directory
+        self.poll = poll
+        self.swaps = 0
+        self._current = None
+        self._loaded = OrderedDict()
+        self._failed = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _unregistered(self):
+        # The fixed paths, reloaded by the artifact registry whenever the file changes
+        path = default_model_path()
+        return Deployment(None, registry.get(path, scorer_loader()), registry.get(path, file_digest), path)
+
+    def _settled(self, version, info):
+        # Already served, or failed to load and not republished since
+        current = self._current
+        return current is not None and current.version == version or self._failed == (version, info['sha256'])
+
+    def refresh(self):
+        # Loads and swaps in the manifest's active version; True when it swapped
+        active = active_version(self.directory)
+        if active is None:
+            return False
+        version, info = active
+        if self._settled(version, info):
+            return False
+        with self._lock:
+            # Checked again under the lock: concurrent callers that saw the old
+            # version all get here, and only the first of them swaps
+            if self._settled(version, info):
+                return False
+            deployment = self._loaded.get(version)
+            if deployment is None:
+                try:
+                    deployment = load_version(version, info, self.directory)
+                except Exception:
+                    # The version being served stays; this one is retried only if republished
+                    self._failed = (version, info['sha256'])
+                    logger.exception('could not load model version %s', version)
+                    return False
+            self._loaded[version] = deployment
+            self._loaded.move_to_end(version)
+            while len(self._loaded) > KEEP_LOADED:
+                _, dropped = self._loaded.popitem(last=False)
+                registry.forget(dropped.path)
+                # The version's own reference frame too; the root df1.pkl stays loaded
+                if reference_path_for(dropped.path) != REFERENCE_PATH:
+                    registry.forget(reference_path_for(dropped.path))
+            # The swap itself: readers see either the old or the new deployment
+            self._current = deployment
+            self.swaps += 1
+        inc('loan_model_swaps_total', version=version)
+        logger.info('serving model version %s', version)
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('model watcher failed')
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and self.poll > 0:
+                self._thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+                self._thread.start()
+
+    def current(self):
+        if self._current is None or self.poll <= 0:
+            self.refresh()
+        self.start()
+        return self._current if self._current is not None else self._unregistered()
+
+    def stats(self):
+        deployment = self.current()
+        return {'version': deployment.tag, 'sha256': deployment.digest, 'swaps': self.swaps,
+                'loaded': list(self._loaded)}
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ModelManager()
+    return _manager
+
+
+def current_model():
+    # The Deployment to score with; hold on to it for the whole request
+    return get_manager().current()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the versioned model registry.')
+    parser.add_argument('--dir', default=MODEL_DIR, help='registry directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish_parser = commands.add_parser('publish', help='add a model as a new version')
+    publish_parser.add_argument('model', help='pipeline pickle to publish')
+    publish_parser.add_argument('--reference', help='feature frame it was trained on (df1.pkl)')
+    publish_parser.add_argument('--data', help='training data, fingerprinted in the manifest')
+    publish_parser.add_argument('--metrics', help='JSON file of evaluation metrics (e.g. core.train output)')
+    publish_parser.add_argument('--version', help='version name (default: next vN)')
+    publish_parser.add_argument('--no-activate', action='store_true', help='publish without serving it')
+    activate_parser = commands.add_parser('activate', help='serve a published version')
+    activate_parser.add_argument('version')
+    commands.add_parser('rollback', help='serve the previously active version again')
+    commands.add_parser('list', help='show published versions')
+    args = parser.parse_args(argv)
+
+    if args.command == 'publish':
+        metrics, params = {}, {}
+        if args.metrics:
+            report = read_json(args.metrics)
+            metrics, params = report.get('metrics', report), report.get('best_params', {})
+        info = publish(args.model, args.reference, args.data, metrics, params, args.version,
+                       not args.no_activate, args.dir)
+        print(f"Published {info['version']} (sha256 {info['sha256'][:12]})")
+    elif args.command == 'activate':
+        activate(args.version, args.dir)
+        print(f'Active version: {args.version}')
+    elif args.command == 'rollback':
+        print(f"Active version: {rollback(args.dir)['active']}")
+    else:
+        manifest = read_manifest(args.dir)
+        for version, info in sorted(manifest['versions'].items(), key=lambda item: item[1]['created_at']):
+            marker = '*' if version == manifest['active'] else ' '
+            created = time.strftime('%Y-%m-%d %H:%M', time.localtime(info['created_at']))
+            metrics = ' '.join(f'{name}={value:.4f}' for name, value in sorted(info['metrics'].items())
+                               if isinstance(value, (int, float)))
+            print(f"{marker} {version:<8} {created}  sha256 {info['sha256'][:12]}  {metrics}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""Cache of predictions for repeated applications.
+
+Entries are keyed on a hash of the model file's digest and the 11 input
+features, so a retrained or newly activated model never serves an old answer. The default
+backend is a per-process LRU; pointing LOAN_PREDICTION_CACHE at a .sqlite
+file shares one cache between every worker process on the host.
+
+Environment:
+    LOAN_PREDICTION_CACHE        memory (default), 0 to disable, or a SQLite path
+    LOAN_PREDICTION_CACHE_SIZE   maximum number of entries (default 65536)
+    LOAN_PREDICTION_CACHE_TTL    seconds an entry stays valid (default: no expiry)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from core.artifacts import file_digest, registry
+from core.metrics import inc
+from core.schema import CATEGORICAL, FEATURES
+
+MAX_ENTRIES = int(os.environ.get('LOAN_PREDICTION_CACHE_SIZE', 65536))
+TTL_SECONDS = float(os.environ.get('LOAN_PREDICTION_CACHE_TTL', 0)) or None
+
+# SQLite's default limit on bound parameters per statement
+SQLITE_MAX_VARIABLES = 999
+
+
+def model_version(path=None):
+    # Content digest of the model file (by default the one served), recomputed only when the file changes
+    if path is None:
+        from core.models import current_model
+
+        return current_model().digest
+    return registry.get(path, file_digest)
+
+
+def _key(version, values):
+    return hashlib.sha1(json.dumps([version, values]).encode()).hexdigest()
+
+
+def feature_keys(df, version):
+    # Numbers are compared as floats (2 and 2.0 score identically), strings as given
+    columns = [df[column].tolist() if column in CATEGORICAL else df[column].to_numpy(dtype=float).tolist()
+               for column in FEATURES]
+    return [_key(version, list(values)) for values in zip(*columns)]
+
+
+def record_keys(records, version):
+    # Same keys as feature_keys, straight from JSON records without a DataFrame
+    return [_key(version, [record[column] if column in CATEGORICAL else float(record[column])
+                           for column in FEATURES])
+            for record in records]
+
+
+class MemoryBackend:
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Shared on-disk LRU; every thread gets its own connection."""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                'key TEXT PRIMARY KEY, prediction REAL, probability REAL, stored_at REAL, used_at REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS predictions_used_at ON predictions (used_at)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, keys):
+        connection = self._connection()
+        found = {}
+        for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+            marks = ','.join('?' * len(chunk))
+            rows = connection.execute(
+                f'SELECT key, stored_at, prediction, probability FROM predictions WHERE key IN ({marks})', chunk)
+            for key, stored_at, prediction, probability in rows:
+                found[key] = (stored_at, prediction, probability)
+        if found:
+            hits = list(found)
+            now = time.time()
+            for start in range(0, len(hits), SQLITE_MAX_VARIABLES - 1):
+                chunk = hits[start:start + SQLITE_MAX_VARIABLES - 1]
+                marks = ','.join('?' * len(chunk))
+                connection.execute(f'UPDATE predictions SET used_at = ? WHERE key IN ({marks})', [now, *chunk])
+        return found
+
+    def put_many(self, items):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)',
+                [(key, prediction, probability, stored_at, now)
+                 for key, (stored_at, prediction, probability) in items])
+            excess = connection.execute('SELECT count(*) FROM predictions').fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute(
+                    'DELETE FROM predictions WHERE key IN '
+                    '(SELECT key FROM predictions ORDER BY used_at LIMIT ?)', (excess,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def delete_many(self, keys):
+        connection = self._connection()
+        connection.executemany('DELETE FROM predictions WHERE key = ?', [(key,) for key in keys])
+
+    def __len__(self):
+        return self._connection().execute('SELECT count(*) FROM predictions').fetchone()[0]
+
+
+class PredictionCache:
+
+    def __init__(self, backend, ttl=TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        # Values are (prediction, probability); expired entries count as misses
+        found = self.backend.get_many(keys)
+        if self.ttl is not None:
+            cutoff = time.time() - self.ttl
+            expired = [key for key, (stored_at, _, _) in found.items() if stored_at < cutoff]
+            if expired:
+                self.backend.delete_many(expired)
+                for key in expired:
+                    del found[key]
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        inc('loan_prediction_cache_requests_total', len(found), result='hit')
+        inc('loan_prediction_cache_requests_total', len(keys) - len(found), result='miss')
+        return {key: (prediction, probability) for key, (_, prediction, probability) in found.items()}
+
+    def put_many(self, items):
+        now = time.time()
+        self.backend.put_many([(key, (now, prediction, probability)) for key, (prediction, probability) in items])
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+        }
+
+
+def predict_cached(scorer, df, cache, version=None):
+    # Returns (predictions, probabilities) arrays, scoring only the rows not cached
+    from core.batch_score import score_frame
+
+    keys = feature_keys(df, version or model_version())
+    found = cache.get_many(keys)
+    predictions = np.empty(len(df))
+    probabilities = np.empty(len(df))
+    missing = []
+    for i, key in enumerate(keys):
+        value = found.get(key)
+        if value is None:
+            missing.append(i)
+        else:
+            predictions[i], probabilities[i] = value
+    if missing:
+        result = score_frame(scorer, df.iloc[missing])
+        predictions[missing] = result['prediction'].to_numpy(dtype=float)
+        probabilities[missing] = result['probability'].to_numpy(dtype=float)
+        cache.put_many([(keys[i], (predictions[i], probabilities[i])) for i in missing])
+    return predictions, probabilities
+
+
+def cache_from_env():
+    setting = os.environ.get('LOAN_PREDICTION_CACHE', 'memory')
+    if setting == '0':
+        return None
+    if setting == 'memory':
+        return PredictionCache(MemoryBackend())
+    return PredictionCache(SQLiteBackend(setting))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    # One cache per process, configured from the environment on first use
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = cache_from_env() or False
+    return _cache or None
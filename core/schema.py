@@ -0,0 +1,200 @@
+"""Column layout and input schema shared by the app, the API, batch scoring and training.
+
+Every feature is declared once with its dtype, valid range or vocabulary.
+normalize_frame cleans and validates a whole DataFrame with column-wise
+operations; normalize_record does the same checks for one decoded JSON
+application. Categories are canonicalized (whitespace stripped, known
+aliases such as 'Graduated' resolved) and can then be spelled the way a
+fitted model's OrdinalEncoder expects, so a model trained on the raw CSV
+values (' Graduate') and one trained on stripped values both score
+correctly.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+FEATURES = [
+    'no_of_dependents', 'education', 'self_employed', 'income_annum',
+    'loan_amount', 'loan_term', 'cibil_score', 'residential_assets_value',
+    'commercial_assets_value', 'luxury_assets_value', 'bank_asset_value'
+]
+
+CATEGORICAL = ['education', 'self_employed']
+
+NUMERIC = [column for column in FEATURES if column not in CATEGORICAL]
+
+TARGET = 'loan_status'
+
+ID_COLUMN = 'loan_id'
+
+# The pipeline predicts 1 for approved and 0 for rejected applications
+STATUS_LABELS = {1: 'Approved', 0: 'Rejected'}
+
+
+class SchemaError(ValueError):
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__('; '.join(self.problems))
+
+
+class Column:
+
+    def __init__(self, name, dtype, minimum=None, maximum=None, vocabulary=None, aliases=None):
+        self.name = name
+        self.dtype = dtype
+        self.minimum = minimum
+        self.maximum = maximum
+        self.vocabulary = vocabulary
+        # Lower-cased spellings accepted for each canonical category
+        self.lookup = None
+        if vocabulary is not None:
+            self.lookup = {value.lower(): value for value in vocabulary}
+            self.lookup.update({alias.lower(): value for alias, value in (aliases or {}).items()})
+
+    @property
+    def categorical(self):
+        return self.vocabulary is not None
+
+    @property
+    def integer(self):
+        return np.dtype(self.dtype).kind == 'i'
+
+
+SCHEMA = {column.name: column for column in [
+    Column('no_of_dependents', 'int64', 0, 20),
+    Column('education', 'object', vocabulary=['Graduate', 'Not Graduate'],
+           aliases={'Graduated': 'Graduate', 'Not Graduated': 'Not Graduate'}),
+    Column('self_employed', 'object', vocabulary=['No', 'Yes']),
+    Column('income_annum', 'float64', 0),
+    Column('loan_amount', 'float64', 0),
+    Column('loan_term', 'int64', 1, 30),
+    Column('cibil_score', 'int64', 300, 900),
+    # The source dataset has a negative residential_assets_value (-100000)
+    Column('residential_assets_value', 'float64'),
+    Column('commercial_assets_value', 'float64', 0),
+    Column('luxury_assets_value', 'float64', 0),
+    Column('bank_asset_value', 'float64', 0),
+]}
+
+
+def model_vocabulary(model):
+    # {column: categories} as spelled by the model's fitted OrdinalEncoder
+    vocabulary = getattr(model, 'vocabulary', None)
+    if vocabulary is not None:
+        return vocabulary
+    vocabulary = {}
+    for _, step in getattr(model, 'steps', []):
+        for transformer in getattr(step, 'named_transformers_', {}).values():
+            columns = getattr(transformer, 'feature_names_in_', [])
+            for column, categories in zip(columns, getattr(transformer, 'categories_', [])):
+                vocabulary[column] = [str(category) for category in categories]
+    return vocabulary
+
+
+@lru_cache(maxsize=None)
+def _spelling(column, categories):
+    # canonical value -> the model's spelling of it (canonical when the model has none)
+    spelled = {str(category).strip(): category for category in categories}
+    return {value: spelled.get(value, value) for value in SCHEMA[column].vocabulary}
+
+
+def _output_lookup(column, vocabulary):
+    lookup = SCHEMA[column].lookup
+    categories = (vocabulary or {}).get(column)
+    if not categories:
+        return lookup
+    spelling = _spelling(column, tuple(categories))
+    return {alias: spelling[value] for alias, value in lookup.items()}
+
+
+def _range_problems(column, values):
+    problems = []
+    if column.minimum is not None and (values < column.minimum).any():
+        problems.append(f'{column.name} below {column.minimum}')
+    if column.maximum is not None and (values > column.maximum).any():
+        problems.append(f'{column.name} above {column.maximum}')
+    return problems
+
+
+def normalize_frame(df, vocabulary=None):
+    """Return the 11 features cleaned, typed and validated, in FEATURES order.
+
+    Raises SchemaError listing every problem found. `vocabulary` maps
+    categorical columns to the spellings a model expects (see
+    model_vocabulary).
+    """
+    missing = [name for name in FEATURES if name not in df.columns]
+    if missing:
+        raise SchemaError([f"missing columns: {', '.join(missing)}"])
+
+    problems = []
+    out = {}
+    for name, column in SCHEMA.items():
+        series = df[name]
+        if column.categorical:
+            # Each distinct value is looked up once, not once per row
+            lookup = _output_lookup(name, vocabulary)
+            codes, uniques = pd.factorize(series)
+            mapped = np.array([lookup.get(str(value).strip().lower()) for value in uniques] + [None], dtype=object)
+            values = mapped[codes]
+            unknown = pd.isna(values)
+            if unknown.any():
+                bad = ', '.join(repr(v) for v in pd.unique(series[unknown])[:5])
+                problems.append(f'unknown {name} values: {bad}')
+            out[name] = values
+            continue
+
+        if series.dtype == bool:
+            problems.append(f'{name} must be numeric')
+            continue
+        if series.dtype.kind not in 'iuf':
+            series = pd.to_numeric(series, errors='coerce')
+        values = series.to_numpy(dtype=float)
+        if np.isnan(values).any():
+            problems.append(f'{name} has {int(np.isnan(values).sum())} missing or non-numeric values')
+            continue
+        if column.integer and not np.array_equal(values, np.floor(values)):
+            problems.append(f'{name} must be a whole number')
+            continue
+        problems.extend(_range_problems(column, values))
+        out[name] = values.astype(column.dtype)
+
+    if problems:
+        raise SchemaError(problems)
+    return pd.DataFrame(out, index=df.index, columns=FEATURES)
+
+
+def normalize_record(record, vocabulary=None):
+    # One JSON-decoded application; returns a new dict with canonical values
+    if not isinstance(record, dict):
+        raise SchemaError(['each application must be a JSON object'])
+    missing = [name for name in FEATURES if name not in record]
+    if missing:
+        raise SchemaError([f"missing fields: {', '.join(missing)}"])
+
+    normalized = {}
+    for name, column in SCHEMA.items():
+        value = record[name]
+        if column.categorical:
+            if not isinstance(value, str):
+                raise SchemaError([f'invalid value for {name}: {value!r}'])
+            category = _output_lookup(name, vocabulary).get(value.strip().lower())
+            if category is None:
+                raise SchemaError([f'unknown {name} value: {value!r}'])
+            normalized[name] = category
+            continue
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value != value:
+            raise SchemaError([f'invalid value for {name}: {value!r}'])
+        if column.integer:
+            if not float(value).is_integer():
+                raise SchemaError([f'{name} must be a whole number'])
+            value = int(value)
+        else:
+            value = float(value)
+        problems = _range_problems(column, np.array([value]))
+        if problems:
+            raise SchemaError(problems)
+        normalized[name] = value
+    return normalized
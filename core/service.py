@@ -0,0 +1,236 @@
+"""JSON scoring endpoint for the loan approval pipeline.
+
+Concurrent requests are micro-batched: a single background thread drains the
+request queue and scores everything that arrived within a few milliseconds in
+one vectorized predict_proba call. Applications already scored by the
+current model are answered from the prediction cache (core.predcache) without
+being queued. Every result carries the version of the model that scored it
+(see core.models), which may change between requests when a new version is
+swapped in.
+
+Run locally:
+    python -m core.service --port 8000
+In production (see render.yaml):
+    gunicorn core.service:app --worker-class gthread --threads 16
+
+    curl -X POST localhost:8000/predict -d '{"no_of_dependents": 2, "education": "Graduate", ...}'
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+from core.batch_score import score_frame
+from core import drift, metrics
+from core.models import current_model, get_manager
+from core.predcache import get_cache, record_keys
+from core.schema import FEATURES, STATUS_LABELS, normalize_record
+
+MAX_BATCH = int(os.environ.get('LOAN_MAX_BATCH', 256))
+MAX_WAIT_MS = float(os.environ.get('LOAN_MAX_WAIT_MS', 2))
+
+
+class MicroBatcher:
+
+    def __init__(self, model_loader=current_model, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.model_loader = model_loader
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, records):
+        future = Future()
+        self._queue.put((records, future))
+        return future
+
+    def _collect(self):
+        # Block for the first request, then gather whatever else arrives
+        # until the batch is full or the wait budget is spent
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                records = [record for records, _ in batch for record in records]
+                metrics.inc('loan_api_batches_total')
+                metrics.inc('loan_api_scored_total', len(records))
+                # The whole batch is scored by one deployment, even if a swap happens meanwhile
+                deployment = self.model_loader()
+                result = score_frame(deployment.scorer, pd.DataFrame.from_records(records, columns=FEATURES))
+                predictions = result['prediction'].tolist()
+                probabilities = result['probability'].tolist()
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            start = 0
+            for records, future in batch:
+                end = start + len(records)
+                future.set_result([_result(prediction, probability, deployment.tag)
+                                   for prediction, probability in zip(predictions[start:end], probabilities[start:end])])
+                start = end
+
+
+def _result(prediction, probability, version):
+    return {
+        'prediction': int(prediction),
+        'label': STATUS_LABELS.get(int(prediction), str(prediction)),
+        'probability': float(probability),
+        'model_version': version,
+    }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    # Created lazily so each gunicorn worker starts its own batching thread
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher()
+                # The API serves /metrics itself; only the profiler needs starting
+                metrics.start(port=None)
+    return _batcher
+
+
+def score_records(records):
+    # Cached applications are answered directly; only the rest are queued
+    cache = get_cache()
+    if cache is None:
+        return get_batcher().submit(records).result()
+    deployment = current_model()
+    keys = record_keys(records, deployment.digest)
+    found = cache.get_many(keys)
+    results = [_result(*found[key], deployment.tag) if key in found else None for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        scored = get_batcher().submit([records[i] for i in missing]).result()
+        # Results of a version swapped in meanwhile would not match the keys
+        cache.put_many([(keys[i], (result['prediction'], result['probability'])) for i, result in zip(missing, scored)
+                        if result['model_version'] == deployment.tag])
+        for i, result in zip(missing, scored):
+            results[i] = result
+    return results
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def parse_records(payload):
+    # Accept a single application, a list of them, or {"applications": [...]}
+    if isinstance(payload, dict) and 'applications' in payload:
+        payload = payload['applications']
+    single = not isinstance(payload, list)
+    records = [payload] if single else payload
+    if not records:
+        raise BadRequest('no applications given')
+    # Reject bad values up front so they cannot fail a whole micro-batch
+    try:
+        records = [normalize_record(record) for record in records]
+    except ValueError as exc:
+        raise BadRequest(str(exc)) from None
+    return records, single
+
+
+def _respond(start_response, status, body):
+    metrics.inc('loan_api_requests_total', status=status.split()[0])
+    data = json.dumps(body).encode()
+    start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(data)))])
+    return [data]
+
+
+def app(environ, start_response):
+    path = environ.get('PATH_INFO', '')
+    method = environ.get('REQUEST_METHOD', 'GET')
+
+    response = metrics.wsgi_response(path, start_response)
+    if response is not None:
+        return response
+
+    if path == '/health':
+        cache = get_cache()
+        return _respond(start_response, '200 OK',
+                        {'status': 'ok', 'model': get_manager().stats(),
+                         'prediction_cache': cache.stats() if cache is not None else None})
+
+    if path != '/predict':
+        return _respond(start_response, '404 Not Found', {'error': 'not found'})
+    if method != 'POST':
+        return _respond(start_response, '405 Method Not Allowed', {'error': 'use POST'})
+
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        payload = json.loads(environ['wsgi.input'].read(length) or b'null')
+        records, single = parse_records(payload)
+    except ValueError as exc:
+        return _respond(start_response, '400 Bad Request', {'error': str(exc)})
+
+    try:
+        with metrics.span('api.predict'):
+            results = score_records(records)
+    except ValueError as exc:
+        # e.g. a non-numeric value in a numeric field
+        return _respond(start_response, '400 Bad Request', {'error': str(exc)})
+    # Counted into the drift monitor's bins (core.drift), cached answers included
+    drift.observe({feature: [record[feature] for record in records] for feature in FEATURES},
+                  [result['prediction'] for result in results])
+    return _respond(start_response, '200 OK', results[0] if single else results)
+
+
+def serve(host='127.0.0.1', port=8000):
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+        request_queue_size = 256
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    # Load and warm the model (and start the version watcher) before accepting traffic
+    current_model()
+    server = make_server(host, port, app, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the loan approval model over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    server = serve(args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}/predict")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
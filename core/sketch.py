@@ -0,0 +1,210 @@
+"""Mergeable KLL quantile sketches.
+
+A sketch keeps a few hundred values in levels of weight 1, 2, 4, ...; when a
+level outgrows its capacity it is sorted and every other value (from a random
+offset) is promoted to the next level. Any quantile is then answered from the
+weighted values with a normalized rank error of about 2/k (around 0.5% for
+the default k=400), whatever the number of values seen. Sketches of separate
+partitions merge into a sketch of the union with the same guarantee, so they
+can be built per chunk, per worker or incrementally from a stream.
+
+Count, sum, sum of squares and the `tail` smallest and largest values are
+tracked exactly alongside, so means, standard deviations, extremes and (for
+box plots) whiskers and outliers in sparse tails do not depend on the
+compaction. Until the first compaction (fewer than about k values) the
+quantiles are exact as well.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_K = 400
+# Smallest and largest values kept exactly
+DEFAULT_TAIL = 256
+# Capacity shrinks by this factor per level below the top one
+DECAY = 2 / 3
+
+
+class KLLSketch:
+
+    def __init__(self, k=DEFAULT_K, seed=None, tail=DEFAULT_TAIL):
+        self.k = k
+        self.tail = tail
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.lowest = np.empty(0)
+        self.highest = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        return max(2, int(np.ceil(self.k * DECAY ** (len(self.levels) - 1 - level))))
+
+    def _compress(self):
+        # Compact the lowest over-full level until every level fits
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            # Levels are concatenations of sorted runs, which a stable (merge) sort combines cheaply
+            items = np.sort(items, kind='stable')
+            # An odd item out stays at this level (copied, so the sorted level can be freed)
+            keep = items[:len(items) % 2].copy()
+            pairs = items[len(keep):]
+            promoted = pairs[self._rng.integers(2)::2]
+            self.levels[level] = keep
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Capacities depend on the number of levels, so recheck from the bottom
+            level = 0 if level + 1 == len(self.levels) - 1 else level + 1
+
+    def _update_tails(self, lowest, highest):
+        # Both arguments and both tails are sorted ascending
+        self.lowest = np.sort(np.concatenate([self.lowest, lowest[:self.tail]]), kind='stable')[:self.tail]
+        self.highest = np.sort(np.concatenate([self.highest, highest[-self.tail:]]), kind='stable')[-self.tail:]
+
+    @property
+    def minimum(self):
+        return self.lowest[0] if len(self.lowest) else np.nan
+
+    @property
+    def maximum(self):
+        return self.highest[-1] if len(self.highest) else np.nan
+
+    def update(self, values, presorted=False):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        if not presorted:
+            values = np.sort(values)
+        self.count += len(values)
+        self.total += values.sum()
+        self.total_squares += np.square(values).sum()
+        self._update_tails(values, values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self._update_tails(other.lowest, other.highest)
+        self._compress()
+        return self
+
+    def weighted_items(self):
+        # (sorted values, weights) summarizing every value seen
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def _ranked(self, ranks):
+        # Values at 0-based ranks: exact within the tails, estimated from the levels elsewhere
+        values, weights = self.weighted_items()
+        cumulative = np.cumsum(weights)
+        estimated = values[np.minimum(np.searchsorted(cumulative, ranks, side='right'), len(values) - 1)]
+        ranks = ranks.astype(np.int64)
+        from_top = self.count - ranks
+        in_lowest = ranks < len(self.lowest)
+        in_highest = from_top <= len(self.highest)
+        result = np.where(in_lowest, self.lowest[np.minimum(ranks, len(self.lowest) - 1)], estimated)
+        return np.where(in_highest & ~in_lowest,
+                        self.highest[np.maximum(len(self.highest) - from_top, 0)], result)
+
+    def quantile(self, qs):
+        # Linear interpolation between ranks, like pandas' default
+        qs = np.asarray(qs, dtype=float)
+        if not self.count:
+            return np.full(qs.shape, np.nan)
+        positions = (self.count - 1) * qs
+        lower = np.floor(positions)
+        low = self._ranked(lower)
+        high = self._ranked(np.minimum(lower + 1, self.count - 1))
+        return low + (high - low) * (positions - lower)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        # Sample standard deviation from the exact running sums
+        if self.count < 2:
+            return np.nan
+        variance = (self.total_squares - self.total * self.total / self.count) / (self.count - 1)
+        return np.sqrt(max(variance, 0.0))
+
+    def to_dict(self):
+        return {
+            'k': self.k,
+            'tail': self.tail,
+            'levels': [items.tolist() for items in self.levels],
+            'count': self.count,
+            'total': self.total,
+            'total_squares': self.total_squares,
+            'lowest': self.lowest.tolist(),
+            'highest': self.highest.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'], tail=data['tail'])
+        sketch.levels = [np.asarray(items, dtype=float) for items in data['levels']] or [np.empty(0)]
+        sketch.count = data['count']
+        sketch.total = data['total']
+        sketch.total_squares = data['total_squares']
+        sketch.lowest = np.asarray(data['lowest'], dtype=float)
+        sketch.highest = np.asarray(data['highest'], dtype=float)
+        return sketch
+
+
+def sketch_groups(frames, pairs, k=DEFAULT_K, tail=DEFAULT_TAIL, seed=0):
+    # {(dimension, measure): {group: sketch}} in one pass over an iterable of
+    # DataFrames. Each frame is sketched on its own and merged into the totals,
+    # as the partitions of a parallel scan would be.
+    totals = {pair: {} for pair in pairs}
+    by_measure = {}
+    for dimension, measure in pairs:
+        by_measure.setdefault(measure, []).append(dimension)
+    for index, frame in enumerate(frames):
+        codes = {}
+        for measure, dimensions in by_measure.items():
+            # One sort per measure; a stable split by group keeps every group's values sorted
+            values = frame[measure].to_numpy(dtype=float)
+            order = np.argsort(values)
+            values = values[order]
+            for dimension in dimensions:
+                if dimension not in codes:
+                    group_codes, uniques = pd.factorize(frame[dimension], sort=True)
+                    # Small integer codes let the stable argsort below use a radix sort
+                    dtype = np.int16 if len(uniques) < 2 ** 15 else np.int64
+                    codes[dimension] = list(uniques), group_codes.astype(dtype)
+                groups, group_codes = codes[dimension]
+                ordered = group_codes[order]
+                split = np.argsort(ordered, kind='stable')
+                bounds = np.searchsorted(ordered[split], np.arange(len(groups) + 1))
+                grouped = values[split]
+                for g, group in enumerate(groups):
+                    part = KLLSketch(k, seed=[seed, index, g], tail=tail)
+                    part.update(grouped[bounds[g]:bounds[g + 1]], presorted=True)
+                    sketch = totals[dimension, measure].get(group)
+                    totals[dimension, measure][group] = part if sketch is None else sketch.merge(part)
+    return totals
+
+
+def merged(sketches):
+    # One sketch of the union, leaving the inputs untouched
+    total = None
+    for sketch in sketches:
+        total = KLLSketch(sketch.k, seed=0, tail=sketch.tail).merge(sketch) if total is None else total.merge(sketch)
+    return total
@@ -0,0 +1,119 @@
+"""Cold-start profile of the Streamlit pages.
+
+Each page is run once, in a fresh interpreter that has only imported
+Streamlit, the way a new worker process serves its first session. The report
+shows, per page, the time spent importing modules (from -X importtime), the
+time of the whole first run (imports, artifact loading and rendering), the
+time of a rerun, the RSS the page added on top of Streamlit, and which heavy
+libraries it pulled in.
+
+Usage:
+    python -m core.startup                        # Home.py and every page in pages/
+    python -m core.startup pages/Analysis.py --repeat 3 --json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries whose import dominates start-up time and memory
+HEAVY_MODULES = ('pandas', 'pyarrow', 'scipy', 'sklearn', 'imblearn', 'matplotlib', 'seaborn', 'PIL',
+                 'joblib', 'duckdb', 'polars')
+
+MARKER = '-- page start --'
+
+_PROFILE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+
+def rss():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({page!r}, default_timeout=600)
+before = set(sys.modules)
+baseline = rss()
+sys.stderr.write({marker!r} + '\\n')
+sys.stderr.flush()
+start = time.perf_counter()
+app.run()
+seconds = time.perf_counter() - start
+after = rss()
+start = time.perf_counter()
+app.run()
+rerun_seconds = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': seconds,
+    'rerun_seconds': rerun_seconds,
+    'rss_bytes': after - baseline,
+    'baseline_rss_bytes': baseline,
+    'modules': sorted({{name.split('.')[0] for name in set(sys.modules) - before}} & set({heavy!r})),
+    'errors': [element.value for element in app.exception],
+}}))
+"""
+
+
+def import_seconds(stderr):
+    # Cumulative time of the top-level imports logged after the marker
+    total = 0
+    started = False
+    for line in stderr.splitlines():
+        if line == MARKER:
+            started = True
+        elif started and line.startswith('import time:'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if not name[1:].startswith(' ') and cumulative.strip().isdigit():
+                total += int(cumulative)
+    return total / 1e6
+
+
+def profile(page):
+    code = _PROFILE.format(root=ROOT, page=os.path.abspath(page), marker=MARKER, heavy=HEAVY_MODULES)
+    # Pages open their artifacts by relative path, as under `streamlit run`
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], check=True,
+                               capture_output=True, text=True, cwd=ROOT)
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['page'] = page
+    result['import_seconds'] = import_seconds(completed.stderr)
+    return result
+
+
+def default_pages():
+    return ['Home.py'] + sorted(os.path.relpath(path, ROOT) for path in glob.glob(os.path.join(ROOT, 'pages', '*.py')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile the cold start of each Streamlit page.')
+    parser.add_argument('pages', nargs='*', help='page scripts (default: Home.py and pages/*.py)')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per page; the fastest is reported')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    for page in args.pages or default_pages():
+        runs = [profile(page) for _ in range(args.repeat)]
+        results.append(min(runs, key=lambda run: run['seconds']))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Streamlit baseline RSS {results[0]['baseline_rss_bytes'] / 1e6:.1f} MB")
+    for result in results:
+        print(f"{result['page']:<22} imports {result['import_seconds'] * 1000:7.1f} ms  "
+              f"first run {result['seconds'] * 1000:7.1f} ms  rerun {result['rerun_seconds'] * 1000:6.1f} ms  "
+              f"RSS +{result['rss_bytes'] / 1e6:6.1f} MB  {' '.join(result['modules']) or '-'}")
+        for error in result['errors']:
+            print(f"    error: {error}")
+
+
+if __name__ == '__main__':
+    main()
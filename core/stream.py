@@ -0,0 +1,253 @@
+"""Streaming ingestion of new loan applications.
+
+Tails an append-only JSONL feed (one application per line, same fields as
+the API), validates and scores new lines in micro-batches and folds them into
+running aggregates: counts per predicted status, Welford means/variances,
+fixed-bin histograms and quantile sketches (see core.sketch) per numeric
+feature, and category counts. Only the new
+lines are read; the aggregates and the feed offset are saved together in a
+small JSON state file that the Analysis page reads.
+
+Usage:
+    python -m core.stream                  # ingest what has been appended, then exit
+    python -m core.stream --follow         # keep tailing the feed
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.artifacts import load_reference_frame, registry
+from core.schema import CATEGORICAL, FEATURES, NUMERIC, STATUS_LABELS, normalize_record
+from core.sketch import KLLSketch
+
+FEED_PATH = os.environ.get('LOAN_FEED', 'applications.jsonl')
+STATE_PATH = os.environ.get('LOAN_FEED_STATE', 'applications_stats.json')
+BATCH_SIZE = 256
+HISTOGRAM_BINS = 30
+POLL_SECONDS = 1.0
+
+
+class RunningStats:
+    """Mergeable per-status aggregates; each batch is combined exactly (Chan et al.)."""
+
+    def __init__(self, edges, groups=None, records=0, invalid=0, sketches=None):
+        self.edges = {feature: np.asarray(e, dtype=float) for feature, e in edges.items()}
+        self.groups = groups or {}
+        self.records = records
+        self.invalid = invalid
+        # {status: {feature: KLLSketch}}; states saved before sketches start empty
+        self.sketches = sketches or {}
+
+    @classmethod
+    def from_reference(cls, reference, bins=HISTOGRAM_BINS):
+        # Bins are fixed once from the training data so every batch lands in the same bins
+        return cls({feature: np.histogram_bin_edges(reference[feature].to_numpy(dtype=float), bins=bins)
+                    for feature in NUMERIC})
+
+    def _group(self, status):
+        group = self.groups.get(status)
+        if group is None:
+            group = self.groups[status] = {
+                'count': 0,
+                'features': {feature: {'count': 0, 'mean': 0.0, 'm2': 0.0,
+                                       'hist': [0] * (len(self.edges[feature]) - 1)}
+                             for feature in NUMERIC},
+                'categories': {column: {} for column in CATEGORICAL},
+            }
+        return group
+
+    def update(self, df, predictions):
+        labels = pd.Series(predictions, index=df.index).map(lambda p: STATUS_LABELS.get(int(p), str(p)))
+        for status, rows in df.groupby(labels.to_numpy()):
+            group = self._group(status)
+            group['count'] += len(rows)
+            sketches = self.sketches.setdefault(status, {})
+            for feature in NUMERIC:
+                values = rows[feature].to_numpy(dtype=float)
+                self._update_feature(group['features'][feature], values, self.edges[feature])
+                sketches.setdefault(feature, KLLSketch()).update(values)
+            for column in CATEGORICAL:
+                counts = group['categories'][column]
+                for value, count in rows[column].value_counts().items():
+                    counts[value] = counts.get(value, 0) + int(count)
+        self.records += len(df)
+
+    @staticmethod
+    def _update_feature(stats, values, edges):
+        n_b = len(values)
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n_a = stats['count']
+        n = n_a + n_b
+        delta = mean_b - stats['mean']
+        stats['mean'] += delta * n_b / n
+        stats['m2'] += m2_b + delta * delta * n_a * n_b / n
+        stats['count'] = n
+        # Values beyond the reference range are counted in the outermost bins
+        bins = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+        hist = np.asarray(stats['hist']) + np.bincount(bins, minlength=len(edges) - 1)
+        stats['hist'] = hist.tolist()
+
+    def summary(self):
+        # count / mean / std and approximate quartiles per feature and predicted status
+        rows = []
+        for status, group in sorted(self.groups.items()):
+            for feature, stats in group['features'].items():
+                count = stats['count']
+                sketch = self.sketches.get(status, {}).get(feature)
+                quartiles = sketch.quantile([0.25, 0.5, 0.75]) if sketch is not None else [np.nan] * 3
+                rows.append({
+                    'loan_status': status,
+                    'feature': feature,
+                    'count': count,
+                    'mean': stats['mean'] if count else np.nan,
+                    'std': np.sqrt(stats['m2'] / (count - 1)) if count > 1 else np.nan,
+                    '25%': quartiles[0],
+                    '50%': quartiles[1],
+                    '75%': quartiles[2],
+                })
+        return pd.DataFrame(rows, columns=['loan_status', 'feature', 'count', 'mean', 'std', '25%', '50%', '75%'])
+
+    def status_counts(self):
+        return pd.Series({status: group['count'] for status, group in sorted(self.groups.items())},
+                         name='count', dtype=int)
+
+    def histogram(self, feature):
+        # Counts per bin (rows) and predicted status (columns), labelled by bin start
+        edges = self.edges[feature]
+        return pd.DataFrame({status: group['features'][feature]['hist']
+                             for status, group in sorted(self.groups.items())},
+                            index=pd.Index(edges[:-1], name=feature))
+
+    def category_counts(self, column):
+        return pd.DataFrame({status: group['categories'][column]
+                             for status, group in sorted(self.groups.items())}).fillna(0).astype(int)
+
+    def to_dict(self):
+        return {
+            'edges': {feature: e.tolist() for feature, e in self.edges.items()},
+            'groups': self.groups,
+            'records': self.records,
+            'invalid': self.invalid,
+            'sketches': {status: {feature: sketch.to_dict() for feature, sketch in sketches.items()}
+                         for status, sketches in self.sketches.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketches = {status: {feature: KLLSketch.from_dict(sketch) for feature, sketch in features.items()}
+                    for status, features in data.get('sketches', {}).items()}
+        return cls(data['edges'], data['groups'], data['records'], data['invalid'], sketches)
+
+
+def read_state(path=STATE_PATH):
+    with open(path) as file:
+        data = json.load(file)
+    return data['offset'], RunningStats.from_dict(data['stats'])
+
+
+def write_state(offset, stats, path=STATE_PATH):
+    # Written atomically so readers never see a half-written file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump({'offset': offset, 'updated_at': time.time(), 'stats': stats.to_dict()}, file)
+    os.replace(tmp_path, path)
+
+
+def _read_stats(path):
+    return read_state(path)[1]
+
+
+def load_stream_stats(path=STATE_PATH):
+    # None until the feed has been ingested at least once
+    if not os.path.exists(path):
+        return None
+    return registry.get(path, _read_stats)
+
+
+def _parse(lines):
+    records, invalid = [], 0
+    for line in lines:
+        try:
+            record = normalize_record(json.loads(line))
+        except ValueError:
+            invalid += 1
+            continue
+        records.append(record)
+    return records, invalid
+
+
+def ingest(feed_path=FEED_PATH, state_path=STATE_PATH, scorer=None, batch_size=BATCH_SIZE):
+    # Processes the lines appended since the last run; returns the number of records scored
+    from core.batch_score import score_frame
+    from core.drift import observe
+    from core.forest import load_scorer
+
+    if os.path.exists(state_path):
+        offset, stats = read_state(state_path)
+    else:
+        offset, stats = 0, RunningStats.from_reference(load_reference_frame())
+    if not os.path.exists(feed_path):
+        return 0
+    if os.path.getsize(feed_path) < offset:
+        # The feed was truncated or replaced; start over
+        offset, stats = 0, RunningStats.from_reference(load_reference_frame())
+
+    scorer = scorer or load_scorer()
+    scored = 0
+    with open(feed_path, 'rb') as file:
+        file.seek(offset)
+        while True:
+            lines = []
+            while len(lines) < batch_size:
+                line = file.readline()
+                # A line without its newline is still being written
+                if not line.endswith(b'\n'):
+                    break
+                lines.append(line)
+            if not lines:
+                break
+            records, invalid = _parse(lines)
+            stats.invalid += invalid
+            if records:
+                df = pd.DataFrame.from_records(records, columns=FEATURES)
+                result = score_frame(scorer, df)
+                stats.update(df, result['prediction'].to_numpy())
+                observe(df, result['prediction'].to_numpy())
+                scored += len(records)
+            offset += sum(len(line) for line in lines)
+            write_state(offset, stats, state_path)
+            if len(lines) < batch_size:
+                break
+    return scored
+
+
+def follow(feed_path=FEED_PATH, state_path=STATE_PATH, poll_seconds=POLL_SECONDS, log=sys.stderr):
+    while True:
+        scored = ingest(feed_path, state_path)
+        if scored and log is not None:
+            print(f"ingested {scored} applications from {feed_path}", file=log)
+        if not scored:
+            time.sleep(poll_seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ingest new applications from a JSONL feed.')
+    parser.add_argument('--feed', default=FEED_PATH)
+    parser.add_argument('--state', default=STATE_PATH)
+    parser.add_argument('--follow', action='store_true', help='keep polling the feed for new lines')
+    args = parser.parse_args(argv)
+
+    if args.follow:
+        follow(args.feed, args.state)
+    else:
+        print(f"ingested {ingest(args.feed, args.state)} applications from {args.feed}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Rebuild pipeline.pkl from loan_approval_dataset.csv.
+
+Runs a cross-validated hyperparameter search over the RandomForest and the
+SMOTE oversampler, with every candidate/fold fitted in parallel across all
+cores. Fitted preprocessors and resampled folds are cached on disk with
+joblib.Memory, so each fold is preprocessed once rather than once per
+candidate.
+
+Every artifact is written under a temporary name and renamed into place,
+and the inference-only export (core.export) is regenerated next to the new
+pipeline, so running processes switch to the new model as a whole.
+
+Usage:
+    python -m core.train                       # full search, writes pipeline.pkl, its export and df1.pkl
+    python -m core.train --quick --output /tmp/pipeline.pkl   # writes /tmp/df1.pkl and its export too
+    python -m core.train --publish             # also publish it as a new registry version (core.models)
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+import tempfile
+import time
+from contextlib import contextmanager
+
+import joblib
+from imblearn.over_sampling import SMOTE
+from imblearn.pipeline import Pipeline
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+from core.artifacts import DATASET_PATH, INFERENCE_PATH, MODEL_PATH, REFERENCE_PATH, read_dataset
+from core.export import export_inference_pipeline
+from core.schema import CATEGORICAL, TARGET, normalize_frame
+
+logger = logging.getLogger(__name__)
+
+# no_of_dependents is not used by the model, as in the original pipeline
+MODEL_NUMERIC = ['income_annum', 'loan_amount', 'loan_term', 'cibil_score', 'residential_assets_value',
+                 'commercial_assets_value', 'luxury_assets_value', 'bank_asset_value']
+
+PARAM_GRID = {
+    'smote__k_neighbors': [3, 5],
+    'classifier__n_estimators': [50, 100, 200],
+    'classifier__max_depth': [None, 10, 20],
+    'classifier__min_samples_leaf': [1, 2],
+}
+
+QUICK_PARAM_GRID = {
+    'smote__k_neighbors': [5],
+    'classifier__n_estimators': [50],
+    'classifier__max_depth': [None, 10],
+}
+
+RANDOM_STATE = 42
+
+
+@contextmanager
+def stage(name, timings):
+    start = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - start
+    logger.info("%s took %.2fs", name, timings[name])
+
+
+def build_pipeline(memory=None):
+    preprocessor = ColumnTransformer([
+        ('cat', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), CATEGORICAL),
+        ('num', StandardScaler(), MODEL_NUMERIC),
+    ])
+    return Pipeline([
+        ('preprocessor', preprocessor),
+        ('smote', SMOTE(random_state=RANDOM_STATE)),
+        ('classifier', RandomForestClassifier(n_estimators=50, random_state=RANDOM_STATE)),
+    ], memory=memory)
+
+
+def load_training_data(path=DATASET_PATH):
+    df = read_dataset(path)
+    # Trained on canonical values (stripped categories), checked against the schema
+    X = normalize_frame(df)
+    y = (df[TARGET].str.strip() == 'Approved').astype(int)
+    return X, y
+
+
+def train(data_path=DATASET_PATH, param_grid=None, cv=5, n_jobs=-1, test_size=0.2, scoring='f1'):
+    timings = {}
+    with stage('load', timings):
+        X, y = load_training_data(data_path)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, stratify=y, random_state=RANDOM_STATE)
+
+    with tempfile.TemporaryDirectory(prefix='loan-train-') as cache_dir:
+        # Candidates share each fold's fitted preprocessor and SMOTE output
+        memory = joblib.Memory(cache_dir, verbose=0)
+        search = GridSearchCV(
+            build_pipeline(memory),
+            param_grid or PARAM_GRID,
+            cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=RANDOM_STATE),
+            scoring=scoring,
+            n_jobs=n_jobs,
+            refit=True,
+        )
+        with stage('search', timings):
+            search.fit(X_train, y_train)
+
+    best = search.best_estimator_
+    best.set_params(memory=None)
+
+    with stage('evaluate', timings):
+        proba = best.predict_proba(X_test)[:, 1]
+        predicted = best.predict(X_test)
+        metrics = {
+            'accuracy': accuracy_score(y_test, predicted),
+            'f1': f1_score(y_test, predicted),
+            'roc_auc': roc_auc_score(y_test, proba),
+            'cv_' + scoring: search.best_score_,
+        }
+
+    report = {
+        'best_params': search.best_params_,
+        'metrics': metrics,
+        'timings': timings,
+        'candidates': len(search.cv_results_['params']),
+        'folds': cv,
+    }
+    return best, X, report
+
+
+def dump(value, path):
+    # Readers (and the artifact registry's hot reload) see the old file or the new one, never half of one
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as file:
+        pickle.dump(value, file)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Retrain the loan approval pipeline.')
+    parser.add_argument('--data', default=DATASET_PATH)
+    parser.add_argument('--output', default=MODEL_PATH)
+    parser.add_argument('--reference-output', default=None,
+                        help=f'where to write the feature frame (default: {REFERENCE_PATH} next to --output); '
+                             'empty to skip')
+    parser.add_argument('--inference-output', default=None,
+                        help=f'where to write the inference-only export (default: {INFERENCE_PATH} '
+                             'next to --output); empty to skip')
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--quick', action='store_true', help='search a small grid')
+    parser.add_argument('--publish', action='store_true',
+                        help='publish the model as a new version of the registry and serve it')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    pipeline, X, report = train(args.data, QUICK_PARAM_GRID if args.quick else PARAM_GRID,
+                                cv=args.cv, n_jobs=args.n_jobs)
+
+    # The reference frame and the export go next to the pipeline unless given,
+    # so a model written elsewhere never replaces the ones being served
+    directory = os.path.dirname(args.output)
+    reference_output = args.reference_output
+    if reference_output is None:
+        reference_output = os.path.join(directory, REFERENCE_PATH)
+    inference_output = args.inference_output
+    if inference_output is None:
+        inference_output = os.path.join(directory, INFERENCE_PATH)
+
+    timings = report['timings']
+    with stage('save', timings):
+        if reference_output:
+            dump(X, reference_output)
+        dump(pipeline, args.output)
+    if inference_output:
+        # Written after the pipeline, so the export is never older than the model it was made from
+        with stage('export', timings):
+            export_inference_pipeline(args.output, inference_output, reference_output or None)
+    if args.publish:
+        from core.models import publish
+
+        with stage('publish', timings):
+            info = publish(args.output, reference_output or None, args.data,
+                           report['metrics'], report['best_params'])
+        report['version'] = info['version']
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Figures shown on the Analysis page.
+
+Every view is a function of the dataset and a few parameters, registered in
+VIEWS under a name, so rendered figures can be cached (core.figcache) and
+pre-rendered outside Streamlit after a data refresh. Matplotlib and seaborn
+are imported by the views themselves, so pages can import the parameters
+below without paying for the plotting stack until a figure must be drawn.
+"""
+from core import charts
+from core.charts import draw_box, draw_histogram
+from core.cube import load_cube
+from core.derived import INCOME_RANGE_LABELS
+from core.backends import load_sample
+
+VIEWS = {}
+
+FEATURE_LABELS = {'bank_asset_value': 'Bank Asset Value'}
+
+STATUS_TITLES = {
+    'no_of_dependents': 'Loan Status for {} Dependents',
+    'education': 'Loan Status for {} education',
+    'self_employed': 'Loan Status for {} Employed',
+}
+
+# Pairplot columns shown with each numeric feature's analysis
+PAIRPLOT_COLUMNS = {
+    'loan_amount': ['cibil_score', 'residential_assets_value', 'loan_amount', 'income_annum'],
+    'cibil_score': ['cibil_score', 'residential_assets_value', 'loan_amount', 'income_annum'],
+    'residential_assets_value': ['residential_assets_value', 'loan_amount', 'income_annum'],
+    'commercial_assets_value': ['commercial_assets_value', 'loan_amount', 'income_annum'],
+    'luxury_assets_value': ['luxury_assets_value', 'loan_amount', 'income_annum'],
+    'bank_asset_value': ['bank_asset_value', 'loan_amount', 'income_annum'],
+}
+
+CATEGORICAL_FEATURES = ['education', 'self_employed', 'loan_status']
+
+
+def view(name):
+    def register(function):
+        VIEWS[name] = function
+        return function
+    return register
+
+
+def label(feature):
+    return FEATURE_LABELS.get(feature, feature)
+
+
+def _figure(**kwargs):
+    from matplotlib.figure import Figure
+
+    return Figure(**kwargs)
+
+
+@view('dependents_distribution')
+def dependents_distribution():
+    import seaborn as sns
+
+    dependents_counts = load_cube().counts('no_of_dependents')
+    fig = _figure(figsize=(8, 5))
+    ax1 = fig.subplots()
+    sns.barplot(x=dependents_counts.index.astype(str), y=dependents_counts.to_numpy(), ax=ax1,
+                hue=dependents_counts.index.astype(str), palette='pastel', legend=False)
+    ax1.set_title("Distribution of No. of Dependents")
+    ax1.set_xlabel("Number of Dependents")
+    ax1.set_ylabel("Frequency")
+    return fig
+
+
+@view('loan_amount_by_dependents')
+def loan_amount_by_dependents():
+    fig = _figure(figsize=(8, 5))
+    ax2 = fig.subplots()
+    draw_box(ax2, load_cube().box_stats('loan_amount', 'no_of_dependents'), palette='Set2')
+    ax2.set_title("Loan Amount Distribution by Number of Dependents")
+    ax2.set_xlabel("Number of Dependents")
+    ax2.set_ylabel("Loan Amount")
+    return fig
+
+
+@view('status_counts')
+def status_counts(dimension, value):
+    loan_counts = load_cube().status_counts(dimension, value)
+    fig = _figure()
+    ax = fig.subplots()
+    loan_counts.plot(kind='bar', ax=ax, color=['green', 'red'])
+    ax.set_ylabel("Count")
+    ax.set_xlabel("Loan Status")
+    ax.set_title(STATUS_TITLES[dimension].format(value))
+    return fig
+
+
+@view('income_range_counts')
+def income_range_counts(loan_status):
+    loan_counts_by_income = load_cube().counts('income_range', {'loan_status': loan_status})
+    loan_counts_by_income = loan_counts_by_income.reindex(INCOME_RANGE_LABELS, fill_value=0)
+    fig = _figure()
+    ax = fig.subplots()
+    loan_counts_by_income.plot(kind='bar', ax=ax, color='skyblue')
+    ax.set_xlabel("Income Range")
+    ax.set_ylabel("Number of Loans")
+    ax.set_title(f"Loan Count by Annual Income (Status: {loan_status})")
+    return fig
+
+
+@view('distribution')
+def distribution(feature):
+    cube = load_cube()
+    fig = _figure(figsize=(10, 5))
+    ax1 = fig.subplots()
+    draw_histogram(ax1, cube.histogram(feature, 30), cube.kde(feature), color='purple')
+    ax1.set_title(f"Overall {feature} Distribution")
+    ax1.set_xlabel(feature)
+    ax1.set_ylabel("Frequency")
+    return fig
+
+
+@view('box_by')
+def box_by(feature, by):
+    titles = {'income_bracket': 'Income Bracket', 'loan_term': 'Loan Term'}
+    fig = _figure(figsize=(10, 6))
+    ax = fig.subplots()
+    draw_box(ax, load_cube().box_stats(feature, by))
+    ax.set_title(f'{label(feature)} by {titles.get(by, by)}')
+    ax.set_xlabel(titles.get(by, by))
+    ax.set_ylabel(label(feature))
+    return fig
+
+
+@view('mean_by')
+def mean_by(feature, by):
+    import seaborn as sns
+
+    avg_df = load_cube().means(feature, by)
+    fig = _figure(figsize=(10, 6))
+    ax2 = fig.subplots()
+    sns.barplot(x=by, y=feature, data=avg_df, hue=by, palette='viridis', legend=False, ax=ax2)
+    ax2.set_title(f'Average {label(feature)} by {by}')
+    ax2.set_xlabel(by)
+    ax2.set_ylabel(f'Average {label(feature)}')
+    return fig
+
+
+@view('pairplot')
+def pairplot(columns):
+    # Scatter for small data, binned 2D density once the row count grows
+    return charts.pairplot(load_sample(list(columns)), list(columns))
+
+
+@view('loan_term_distribution')
+def loan_term_distribution():
+    fig = _figure(figsize=(10, 6))
+    ax = fig.subplots()
+    draw_histogram(ax, load_cube().histogram('loan_term', 10), color='skyblue')
+    ax.set_title("Loan Term Distribution (All Loans)")
+    ax.set_xlabel("Loan Term")
+    ax.set_ylabel("Frequency")
+    return fig
+
+
+@view('loan_term_by_status')
+def loan_term_by_status():
+    import seaborn as sns
+
+    avg_loan_term = load_cube().means('loan_term', 'loan_status')
+    fig2 = _figure(figsize=(8, 5))
+    ax2 = fig2.subplots()
+    sns.barplot(data=avg_loan_term, x='loan_status', y='loan_term', hue='loan_status',
+                palette='Set2', legend=False, ax=ax2)
+    ax2.set_title("Average Loan Term by Loan Status")
+    ax2.set_xlabel("Loan Status")
+    ax2.set_ylabel("Average Loan Term")
+    return fig2
+
+
+@view('loan_term_counts')
+def loan_term_counts():
+    loan_term_count = load_cube().counts(['loan_status', 'loan_term']).unstack(fill_value=0).T
+    fig3 = _figure(figsize=(10, 6))
+    ax3 = fig3.subplots()
+    loan_term_count.plot(kind='bar', stacked=True, ax=ax3, color=['green', 'red'])
+    ax3.set_title("Loan Term Count by Loan Status (Approved vs Rejected)")
+    ax3.set_xlabel("Loan Term")
+    ax3.set_ylabel("Number of Loans")
+    return fig3
+
+
+
+def all_views():
+    # Every (view, parameters) pair the Analysis page can ask for
+    cube = load_cube()
+    yield 'dependents_distribution', {}
+    yield 'loan_amount_by_dependents', {}
+    for dimension in STATUS_TITLES:
+        for value in cube.values(dimension):
+            yield 'status_counts', {'dimension': dimension, 'value': value}
+    for loan_status in cube.values('loan_status'):
+        yield 'income_range_counts', {'loan_status': loan_status}
+    for feature, columns in PAIRPLOT_COLUMNS.items():
+        yield 'distribution', {'feature': feature}
+        for by in ['income_bracket', 'loan_term'] + CATEGORICAL_FEATURES:
+            yield 'box_by', {'feature': feature, 'by': by}
+        for by in CATEGORICAL_FEATURES:
+            yield 'mean_by', {'feature': feature, 'by': by}
+        yield 'pairplot', {'columns': columns}
+    yield 'loan_term_distribution', {}
+    yield 'loan_term_by_status', {}
+    yield 'loan_term_counts', {}
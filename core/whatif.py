@@ -0,0 +1,106 @@
+"""What-if sensitivity sweeps around one application.
+
+One or two numeric features are varied over a grid around the applicant's
+values while every other input is held fixed; the whole grid is scored in a
+single batched predict_proba call (via score_frame) and the approval
+probability is returned as a curve or a surface, with the points where it
+crosses the decision threshold.
+"""
+import numpy as np
+
+from core.batch_score import score_frame
+from core.schema import NUMERIC, SCHEMA
+
+# Input ranges of the Prediction page sliders, which bound every sweep
+RANGES = {
+    'no_of_dependents': (0, 5),
+    'income_annum': (0, 10000000),
+    'loan_amount': (0, 10000000),
+    'loan_term': (SCHEMA['loan_term'].minimum, 20),
+    'cibil_score': (SCHEMA['cibil_score'].minimum, SCHEMA['cibil_score'].maximum),
+    'residential_assets_value': (0, 10000000),
+    'commercial_assets_value': (0, 10000000),
+    'luxury_assets_value': (0, 10000000),
+    'bank_asset_value': (0, 10000000),
+}
+
+# Approved when the approval probability is above this (the argmax of two classes)
+THRESHOLD = 0.5
+CURVE_POINTS = 101
+SURFACE_POINTS = 41
+
+
+def sweep_values(feature, center, points, width=1.0):
+    # `points` values covering `width` of the feature's range around `center`,
+    # clipped to the range; integer features keep whole, distinct values
+    low, high = RANGES[feature]
+    span = (high - low) * width
+    # The window slides inward rather than shrinking at either end of the range
+    start = min(max(low, center - span / 2), high - span)
+    stop = start + span
+    values = np.append(np.linspace(start, stop, points), center)
+    if SCHEMA[feature].integer:
+        values = np.round(values)
+    return np.unique(values)
+
+
+def sensitivity_grid(applicant, axes):
+    # Every combination of the axis values, other inputs copied from the one-row `applicant`
+    features = list(axes)
+    mesh = np.meshgrid(*axes.values(), indexing='ij')
+    grid = applicant.loc[applicant.index.repeat(mesh[0].size)].reset_index(drop=True)
+    for feature, values in zip(features, mesh):
+        grid[feature] = values.ravel().astype(applicant[feature].dtype)
+    return grid
+
+
+def sweep(scorer, applicant, features, points=None, width=1.0):
+    # ({feature: values}, approval probability shaped like the grid)
+    if not 1 <= len(features) <= 2 or not set(features) <= set(NUMERIC):
+        raise ValueError('sweep one or two numeric features')
+    points = points or (CURVE_POINTS if len(features) == 1 else SURFACE_POINTS)
+    axes = {feature: sweep_values(feature, applicant[feature].iloc[0], points, width) for feature in features}
+    grid = sensitivity_grid(applicant, axes)
+    probability = score_frame(scorer, grid)['probability'].to_numpy()
+    return axes, probability.reshape([len(values) for values in axes.values()])
+
+
+def crossings(values, probability, threshold=THRESHOLD):
+    # Feature values where the approval probability crosses the threshold, linearly interpolated
+    above = probability > threshold
+    edges = np.flatnonzero(above[1:] != above[:-1])
+    p0, p1 = probability[edges], probability[edges + 1]
+    return values[edges] + (threshold - p0) / (p1 - p0) * (values[edges + 1] - values[edges])
+
+
+def surface_figure(axes, probability, applicant, threshold=THRESHOLD):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
+    features = list(axes)
+    if len(features) == 1:
+        feature = features[0]
+        values = axes[feature]
+        ax.plot(values, probability, color='C0')
+        ax.fill_between(values, 0, probability, where=probability > threshold, color='green', alpha=0.15,
+                        step='mid', label='Approved')
+        ax.axhline(threshold, color='grey', linestyle='--')
+        ax.axvline(applicant[feature].iloc[0], color='black', linestyle=':', label='Applicant')
+        ax.set_xlabel(feature)
+        ax.set_ylabel('Approval probability')
+        ax.set_ylim(0, 1)
+        ax.legend(loc='best')
+    else:
+        x, y = features
+        mesh = ax.pcolormesh(axes[x], axes[y], probability.T, cmap='RdYlGn', vmin=0, vmax=1, shading='nearest')
+        if probability.min() < threshold <= probability.max():
+            ax.contour(axes[x], axes[y], probability.T, levels=[threshold], colors='black', linewidths=1.5)
+        ax.scatter(applicant[x], applicant[y], marker='*', s=200, color='black', label='Applicant')
+        fig.colorbar(mesh, ax=ax, label='Approval probability')
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+        ax.legend(loc='upper right')
+    ax.set_title('Approval Probability (what-if)')
+    return fig
+
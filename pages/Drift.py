@@ -0,0 +1,55 @@
+import streamlit as st
+
+from core import metrics
+from core.drift import (DRIFT_DIR, PSI_MODERATE, PSI_SIGNIFICANT, WINDOW_SECONDS, WINDOW_SLOTS, approval_drift,
+                        bin_shares, feature_drift, load_reference_profile, load_slots, trend, window_counts)
+from core.schema import FEATURES
+
+st.set_page_config(page_title='Loan Drift Monitor', layout='wide')
+st.title("📡 Data & Prediction Drift")
+
+# Timings and counters, exported only when LOAN_METRICS=1
+metrics.start()
+metrics.count_session(st.session_state, 'drift')
+
+# Fixed-bin counts of the scored traffic, summed over every scoring process (see core.drift)
+with metrics.span('page.drift'):
+    profile = load_reference_profile()
+    slots = load_slots(profile)
+    counts = window_counts(profile, slots)
+    approval = approval_drift(profile, counts)
+
+st.markdown(f"Applications scored in the last **{WINDOW_SECONDS / 60:.0f} minutes**, "
+            "compared with the data the model was trained on.")
+st.button('Refresh')
+
+if not approval['rows']:
+    st.info(f"No applications scored in this window yet. Predictions made by the API, the Prediction page "
+            f"and `python -m core.stream` are counted in {DRIFT_DIR}/.")
+    st.stop()
+
+drift = feature_drift(profile, counts)
+worst = drift['psi'].idxmax()
+
+col1, col2, col3 = st.columns(3)
+col1.metric('Applications scored', approval['rows'])
+col2.metric('Predicted approval rate', f"{approval['rate']:.1%}",
+            f"{approval['difference']:+.1%} vs training data ({approval['reference_rate']:.1%})", delta_color='off')
+col3.metric('Largest PSI', f"{drift.loc[worst, 'psi']:.3f}", worst, delta_color='off')
+
+st.subheader("Feature Drift")
+st.dataframe(drift)
+st.caption(f"PSI above {PSI_MODERATE} is a moderate shift and above {PSI_SIGNIFICANT} a significant one. "
+           "KS is the largest gap between the cumulative distributions of a numeric feature.")
+
+feature = st.selectbox('Select Feature', FEATURES, index=FEATURES.index(worst))
+
+st.subheader(f"{feature}: Training Data vs Recent Applications")
+shares = bin_shares(profile, counts, feature)
+# Numbered so the chart keeps the bins in order
+shares.index = [f'{number:02d} {label}' for number, label in enumerate(shares.index, 1)]
+st.bar_chart(shares, stack=False)
+
+st.subheader("Over Time")
+st.line_chart(trend(profile, slots, feature))
+st.caption(f"Approval rate and PSI of {feature} per {WINDOW_SECONDS / WINDOW_SLOTS / 60:.0f}-minute slot.")
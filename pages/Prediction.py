@@ -1,52 +1,68 @@
 import streamlit as st
-import numpy as np
 import pandas as pd
-import pickle
+
+from core.batch_score import score_frame
+from core import drift, metrics
+from core.figcache import figure_bytes
+from core.forest import explainer
+from core.models import current_model
+from core.predcache import get_cache, predict_cached
+from core.schema import FEATURES, NUMERIC, SCHEMA, SchemaError, normalize_frame
+from core.whatif import RANGES, crossings, surface_figure, sweep
 
 st.set_page_config(page_title='Loan Approval Predictor',layout="centered")
 st.title("🏦 Loan Approval Prediction App")
 
-# Load the pre-trained DataFrame and model pipeline
-with open('df1.pkl', 'rb') as file:
-    df = pickle.load(file)
-
-with open('pipeline.pkl', 'rb') as file:
-    pipeline = pickle.load(file)
+# Timings and counters, exported only when LOAN_METRICS=1
+metrics.start()
+metrics.count_session(st.session_state, 'prediction')
 
 st.markdown("Fill in the applicant's details to predict loan approval.")
 
 # User inputs
-no_of_dependents = st.slider('Choose Number of Dependents', 0, 5)
-Education = st.selectbox('Choose Education', ['Graduated', 'Not Graduated'])
-self_employed = st.selectbox('Self Employed', ['Yes', 'No'])
-income_annum = st.slider('Choose Annual Income', 0, 10000000)
-loan_amount = st.slider('Choose Loan Amount', 0, 10000000)
-loan_term = st.slider('Choose Loan Duration', 0, 20)
-cibil_score = st.slider('Choose Cibil Score', 0, 1000)
-residential_assets_value = st.slider('Choose Residential Assets Value', 0, 10000000)
-commercial_assets_value = st.slider('Choose Commercial Assets Value', 0, 10000000)
-luxury_assets_value = st.slider('Choose Luxury Assets Value', 0, 10000000)
-bank_asset_value = st.slider('Choose Bank Asset Value', 0, 10000000)
+no_of_dependents = st.slider('Choose Number of Dependents', *RANGES['no_of_dependents'])
+Education = st.selectbox('Choose Education', SCHEMA['education'].vocabulary)
+self_employed = st.selectbox('Self Employed', SCHEMA['self_employed'].vocabulary[::-1])
+income_annum = st.slider('Choose Annual Income', *RANGES['income_annum'])
+loan_amount = st.slider('Choose Loan Amount', *RANGES['loan_amount'])
+loan_term = st.slider('Choose Loan Duration', *RANGES['loan_term'])
+cibil_score = st.slider('Choose Cibil Score', *RANGES['cibil_score'])
+residential_assets_value = st.slider('Choose Residential Assets Value', *RANGES['residential_assets_value'])
+commercial_assets_value = st.slider('Choose Commercial Assets Value', *RANGES['commercial_assets_value'])
+luxury_assets_value = st.slider('Choose Luxury Assets Value', *RANGES['luxury_assets_value'])
+bank_asset_value = st.slider('Choose Bank Asset Value', *RANGES['bank_asset_value'])
+
+data = [[
+    no_of_dependents, Education, self_employed, income_annum,
+    loan_amount, loan_term, cibil_score, residential_assets_value,
+    commercial_assets_value, luxury_assets_value, bank_asset_value
+]]
 
 button_clicked = st.button('Predict')
 
 if button_clicked:
-    data = [[
-        no_of_dependents, Education, self_employed, income_annum,
-        loan_amount, loan_term, cibil_score, residential_assets_value,
-        commercial_assets_value, luxury_assets_value, bank_asset_value
-    ]]
-    columns = [
-        'no_of_dependents', 'education', 'self_employed', 'income_annum',
-        'loan_amount', 'loan_term', 'cibil_score', 'residential_assets_value',
-        'commercial_assets_value', 'luxury_assets_value', 'bank_asset_value'
-    ]
-
-    # Convert to DataFrame
-    one_df = pd.DataFrame(data, columns=columns)
-
-    # Make prediction
-    prediction = pipeline.predict(one_df)
+    # Convert to DataFrame, validated against the shared input schema
+    try:
+        with metrics.span('page.feature_prep'):
+            one_df = normalize_frame(pd.DataFrame(data, columns=FEATURES))
+    except SchemaError as exc:
+        st.error(f"Invalid input: {exc}")
+        st.stop()
+
+    # The model version currently served, loaded on the first click rather than when the
+    # page opens; this run keeps it even if a newer version is swapped in meanwhile
+    deployment = current_model()
+    pipeline = deployment.scorer
+
+    # Make prediction; unchanged inputs are answered from the prediction cache
+    cache = get_cache()
+    with metrics.span('page.predict'):
+        if cache is not None:
+            prediction, _ = predict_cached(pipeline, one_df, cache, version=deployment.digest)
+        else:
+            prediction = score_frame(pipeline, one_df)['prediction'].to_numpy()
+    # Counted towards the Drift page (core.drift)
+    drift.observe(one_df, prediction)
 
     # Show raw prediction (optional)
     st.text(f"Raw Prediction Value: {prediction[0]}")
@@ -55,4 +71,42 @@ if button_clicked:
     if prediction[0] == 1:
         st.success("Prediction: Loan Approved")
     else:
-        st.error("Prediction: Loan Not Approved")
\ No newline at end of file
+        st.error("Prediction: Loan Not Approved")
+    st.caption(f"Model version: {deployment.tag}")
+
+    # Why: each input's share of the approval probability, from the forest's split paths
+    with metrics.span('page.explain'):
+        base_rate, contributions = explainer(pipeline).explain(one_df)
+    contributions = contributions.iloc[0]
+    contributions = contributions[contributions.abs().sort_values(ascending=False).index]
+    st.subheader("Why this decision?")
+    st.bar_chart(contributions.rename('Contribution to approval probability'), horizontal=True)
+    st.caption(f"Approval probability = {base_rate:.2f} (average applicant) "
+               f"+ the contributions above = {base_rate + contributions.sum():.2f}")
+
+
+# What-if: vary one or two inputs around the applicant and score the whole grid in one call
+st.subheader("🔍 What-if Analysis")
+sweep_features = st.multiselect('Features to vary (one or two)', NUMERIC, default=['loan_amount', 'cibil_score'],
+                                max_selections=2)
+sweep_width = st.slider('Sweep width (% of each slider range)', 10, 100, 100)
+
+if st.button('Run What-if') and sweep_features:
+    try:
+        applicant = normalize_frame(pd.DataFrame(data, columns=FEATURES))
+    except SchemaError as exc:
+        st.error(f"Invalid input: {exc}")
+        st.stop()
+
+    with metrics.span('page.whatif'):
+        axes, probability = sweep(current_model().scorer, applicant, sweep_features, width=sweep_width / 100)
+    st.image(figure_bytes(surface_figure(axes, probability, applicant)), use_container_width=True)
+    st.caption(f"{probability.size} combinations scored in one batch.")
+
+    if len(sweep_features) == 1:
+        feature = sweep_features[0]
+        boundary = crossings(axes[feature], probability)
+        if len(boundary):
+            st.write(f"Approval decision changes at {feature} ≈ " + ', '.join(f'{value:,.0f}' for value in boundary))
+        else:
+            st.write(f"The decision does not change over this range of {feature}.")
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True, scope='session')
+def repo_root():
+    # Artifacts are opened by relative path, as under `streamlit run`
+    previous = os.getcwd()
+    os.chdir(ROOT)
+    yield ROOT
+    os.chdir(previous)
+
+
+@pytest.fixture(scope='session')
+def dataset(repo_root):
+    from core.artifacts import read_dataset
+
+    return read_dataset('loan_approval_dataset.csv')
+
+
+@pytest.fixture(scope='session')
+def reference(repo_root):
+    from core.artifacts import unpickle
+
+    return unpickle('df1.pkl')
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import cube as cube_module
+from core.backends import BACKENDS
+from core.cube import COLUMNS, HISTOGRAM_BINS, MEASURES, AggregateCube
+from core.dataset import ingest, read_columns
+
+# Module each backend needs; a case is skipped when it is not installed
+REQUIRES = {'chunked': 'pyarrow', 'duckdb': 'duckdb', 'polars': 'polars'}
+
+
+@pytest.fixture(scope='module')
+def store(repo_root, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('store') / 'loan_approval_dataset.parquet')
+    ingest('loan_approval_dataset.csv', path)
+    return path
+
+
+@pytest.fixture(scope='module')
+def expected(store):
+    return AggregateCube.build(read_columns(store, COLUMNS))
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request, store):
+    pytest.importorskip(REQUIRES[request.param])
+    return BACKENDS[request.param](store)
+
+
+def _boxes(stats):
+    # Group labels compared as the strings the page shows (in memory they keep the store's dtypes)
+    return stats.drop(columns='fliers').set_axis(stats.index.astype(str).rename(None))
+
+
+def test_exact_cube_matches_in_memory_build(monkeypatch, backend, expected):
+    monkeypatch.setattr(cube_module, 'QUANTILES', 'exact')
+    actual = AggregateCube.from_backend(backend)
+
+    pd.testing.assert_frame_equal(actual.base, expected.base, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(actual.summaries, expected.summaries, rtol=1e-12)
+    assert set(actual.boxes) == set(expected.boxes)
+    for key, stats in expected.boxes.items():
+        pd.testing.assert_frame_equal(_boxes(actual.boxes[key]), _boxes(stats), check_dtype=False, rtol=1e-12)
+        # Outliers are in row order in memory and in value order out of core
+        for found, wanted in zip(actual.boxes[key]['fliers'], stats['fliers']):
+            assert np.array_equal(np.sort(np.asarray(found, dtype=float)), np.sort(np.asarray(wanted, dtype=float)))
+    for measure in MEASURES:
+        for bins in HISTOGRAM_BINS:
+            counts, edges = actual.histogram(measure, bins)
+            assert np.array_equal(counts, expected.histogram(measure, bins)[0])
+            np.testing.assert_allclose(edges, expected.histogram(measure, bins)[1])
+        np.testing.assert_allclose(actual.kde(measure)[1], expected.kde(measure)[1], rtol=1e-9)
+
+
+def test_sketched_cube_matches_exact_statistics(monkeypatch, backend, expected):
+    # Quartiles are approximate here (see test_sketch); everything else is exact
+    monkeypatch.setattr(cube_module, 'QUANTILES', 'auto')
+    actual = AggregateCube.from_backend(backend)
+
+    pd.testing.assert_frame_equal(actual.base, expected.base, check_dtype=False, check_categorical=False)
+    exact = ['count', 'mean', 'std', 'min', 'max']
+    pd.testing.assert_frame_equal(actual.summaries.loc[exact], expected.summaries.loc[exact], rtol=1e-9)
+    for key, stats in expected.boxes.items():
+        assert list(actual.boxes[key].index.astype(str)) == list(stats.index.astype(str))
+        np.testing.assert_allclose(actual.boxes[key]['mean'].to_numpy(dtype=float),
+                                   stats['mean'].to_numpy(dtype=float), rtol=1e-9)
+
+
+def test_backend_selection(monkeypatch, store):
+    from core import backends
+
+    monkeypatch.delenv('LOAN_ANALYSIS_BACKEND', raising=False)
+    assert backends.backend_name(store) is None
+    assert backends.backend_name(store, 'pandas') is None
+    assert backends.backend_name(store, 'chunked') == 'chunked'
+    # Above the in-memory limit, the first installed of DuckDB and Polars, else pyarrow alone
+    monkeypatch.setattr(backends, 'IN_MEMORY_MAX_ROWS', 0)
+    installed = [name for name in ('duckdb', 'polars') if backends._available(name)]
+    assert backends.backend_name(store) == (installed[0] if installed else 'chunked')
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.cube import BOX_PAIRS, DIMENSIONS, MEASURES, AggregateCube
+from core.derived import DerivedFeatures
+from core.schema import TARGET
+
+
+@pytest.fixture(scope='module')
+def frame(dataset):
+    # The rows the cube aggregates, with the derived income brackets
+    frame = dataset.copy()
+    for name, column in DerivedFeatures.from_income(frame['income_annum']).columns(index=frame.index).items():
+        frame[name] = column
+    return frame
+
+
+@pytest.fixture(scope='module')
+def cube(dataset):
+    return AggregateCube.build(dataset)
+
+
+def _box_stats(values):
+    # matplotlib's boxplot_stats (whis=1.5) of one group
+    q1, med, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {'q1': q1, 'med': med, 'q3': q3, 'whislo': inside.min(), 'whishi': inside.max(), 'mean': values.mean()}
+
+
+@pytest.mark.parametrize('dimension', [dimension for dimension in DIMENSIONS if dimension != TARGET])
+def test_status_counts(cube, frame, dimension):
+    for value in frame[dimension].dropna().unique():
+        expected = frame.loc[frame[dimension] == value, TARGET].value_counts()
+        actual = cube.status_counts(dimension, value)
+        pd.testing.assert_series_equal(actual.sort_index(), expected.sort_index(), check_names=False)
+
+
+def test_counts(cube, frame):
+    expected = frame.groupby([TARGET, 'loan_term'], observed=True).size()
+    pd.testing.assert_series_equal(cube.counts([TARGET, 'loan_term']), expected, check_names=False)
+
+
+@pytest.mark.parametrize('by', DIMENSIONS)
+def test_means(cube, frame, by):
+    for measure in MEASURES:
+        if measure == by:
+            continue
+        expected = frame.groupby(by, observed=True)[measure].mean()
+        actual = cube.means(measure, by).set_index(by)[measure]
+        np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-12)
+        assert list(actual.index) == list(expected.index)
+
+
+@pytest.mark.parametrize('measure,by', [(measure, dimension) for dimension, measure in BOX_PAIRS])
+def test_box_stats(cube, frame, measure, by):
+    groups = {str(key): group.to_numpy(dtype=float)
+              for key, group in frame.groupby(by, observed=True)[measure]}
+    stats = cube.box_stats(measure, by)
+    assert [row['label'] for row in stats] == list(groups)
+    for row in stats:
+        expected = _box_stats(groups[row['label']])
+        for name, value in expected.items():
+            assert row[name] == pytest.approx(value, rel=1e-12), (row['label'], name)
+
+
+def test_describe(cube, frame):
+    for measure in MEASURES:
+        pd.testing.assert_series_equal(cube.describe(measure), frame[measure].describe(), check_names=False)
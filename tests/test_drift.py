@@ -0,0 +1,64 @@
+import os
+import socket
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from core import drift
+from core.artifacts import registry
+from core.drift import DriftMonitor, ReferenceProfile, load_slots, prune_states, window_counts
+
+NOW = 1_800_000_000.0
+WINDOW = 3600.0
+
+
+@pytest.fixture(scope='module')
+def profile(reference):
+    return ReferenceProfile.from_frame(reference, 0.6)
+
+
+def write_state(profile, directory, name, rows, now, written_at=None):
+    monitor = DriftMonitor(profile, window_seconds=WINDOW, path=os.path.join(directory, name))
+    monitor.observe(rows, np.ones(len(rows), dtype=int), now=now)
+    monitor.flush()
+    written_at = now if written_at is None else written_at
+    os.utime(monitor.path, (written_at, written_at))
+    return monitor.path
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_windows_add_up_every_live_process(profile, reference, tmp_path):
+    rows = reference.head(10)
+    write_state(profile, tmp_path, f'{socket.gethostname()}-{os.getpid()}.json', rows, NOW - 60)
+    write_state(profile, tmp_path, 'elsewhere-1.json', rows, NOW - 60)
+    counts = window_counts(profile, load_slots(profile, tmp_path, WINDOW, now=NOW))
+    assert counts[profile.approval].sum() == 20
+
+
+def test_stale_and_exited_files_are_deleted(profile, reference, tmp_path):
+    rows = reference.head(10)
+    live = write_state(profile, tmp_path, f'{socket.gethostname()}-{os.getpid()}.json', rows, NOW - 60)
+    stale = write_state(profile, tmp_path, f'elsewhere-{os.getpid()}.json', rows, NOW - 2 * WINDOW)
+    exited = write_state(profile, tmp_path, f'{socket.gethostname()}-{exited_pid()}.json', rows, NOW - 60)
+    registry.get(stale, drift._read_state)
+
+    assert prune_states(tmp_path, WINDOW, now=NOW) == [live]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(live)]
+    assert not any(entry['path'] == os.path.relpath(stale) for entry in registry.stats())
+    assert not os.path.exists(exited)
+
+
+def test_state_files_are_capped(profile, reference, tmp_path):
+    rows = reference.head(1)
+    paths = [write_state(profile, tmp_path, f'elsewhere-{pid}.json', rows, NOW - 60, NOW - 60 + pid)
+             for pid in range(10)]
+    assert prune_states(tmp_path, WINDOW, max_files=3, now=NOW) == paths[:-4:-1]
+    assert len(os.listdir(tmp_path)) == 3
+
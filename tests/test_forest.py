@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from core.artifacts import unpickle
+from core.batch_score import score_frame
+from core.forest import FLAT_MAX_ROWS, FlatForest, explainer
+from core.schema import normalize_frame
+
+
+@pytest.fixture(scope='module')
+def pipeline(repo_root):
+    return unpickle('pipeline.pkl')
+
+
+@pytest.fixture(scope='module')
+def forest(pipeline):
+    return FlatForest.from_pipeline(pipeline)
+
+
+@pytest.fixture(scope='module')
+def unknown(reference):
+    # Categories the encoder never saw are encoded as -1
+    frame = reference.copy()
+    frame['education'] = np.where(np.arange(len(frame)) % 3 == 0, 'Postgraduate', frame['education'])
+    frame['self_employed'] = np.where(np.arange(len(frame)) % 5 == 0, 'Unknown', frame['self_employed'])
+    return frame
+
+
+@pytest.fixture(scope='module')
+def canonical(reference):
+    # As the app and the API pass applications on: 'Graduate', not the model's ' Graduate'
+    return normalize_frame(reference)
+
+
+def _batches(frame, size=FLAT_MAX_ROWS):
+    return [frame.iloc[start:start + size] for start in range(0, len(frame), size)]
+
+
+def test_flattened_preprocessor(pipeline, forest, unknown):
+    preprocessor = pipeline.named_steps['preprocessor']
+    assert np.array_equal(forest.preprocessor.transform(unknown), preprocessor.transform(unknown))
+    assert (forest.preprocessor.transform(unknown)[:, :2] == -1).any()
+
+
+@pytest.mark.parametrize('frame_name', ['reference', 'unknown'])
+def test_predict_proba_is_bit_identical(request, pipeline, forest, frame_name):
+    frame = request.getfixturevalue(frame_name)
+    # Batches small enough for the flat walk, single rows, and the whole frame
+    for batch in _batches(frame) + [frame.iloc[[0]], frame.iloc[[-1]], frame]:
+        assert np.array_equal(forest.predict_proba(batch), pipeline.predict_proba(batch))
+    assert np.array_equal(forest.predict(frame), pipeline.predict(frame))
+
+
+@pytest.mark.parametrize('frame_name', ['reference', 'canonical'])
+def test_contributions_add_up_to_the_approval_probability(request, forest, frame_name):
+    frame = request.getfixturevalue(frame_name)
+    for batch in _batches(frame) + [frame]:
+        bias, contributions = forest.explain(batch)
+        approval = score_frame(forest, batch)['probability'].to_numpy()
+        assert list(contributions.index) == list(batch.index)
+        np.testing.assert_allclose(bias + contributions.sum(axis=1).to_numpy(), approval, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('scorer_name', ['pipeline', 'forest'])
+def test_canonical_input_is_explained_as_scored(request, canonical, scorer_name):
+    # The Prediction page explains canonical input straight from normalize_frame
+    scorer = request.getfixturevalue(scorer_name)
+    rows = canonical.head(500)
+    bias, contributions = explainer(scorer).explain(rows)
+    probability = score_frame(scorer, rows)['probability'].to_numpy()
+    np.testing.assert_allclose(bias + contributions.sum(axis=1).to_numpy(), probability, rtol=0, atol=1e-12)
@@ -0,0 +1,148 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from core import models
+from core.artifacts import registry
+from core.models import ModelManager, activate, publish, read_manifest, rollback
+
+
+@pytest.fixture(scope='module')
+def published(repo_root, tmp_path_factory):
+    # Three versions of the shipped pipeline, v1 with its own reference frame; v3 is active
+    directory = str(tmp_path_factory.mktemp('published') / 'models')
+    publish('pipeline.pkl', 'df1.pkl', 'loan_approval_dataset.csv', {'f1': 0.9}, directory=directory)
+    publish('pipeline.pkl', directory=directory)
+    publish('pipeline.pkl', directory=directory)
+    return directory
+
+
+@pytest.fixture
+def directory(published, tmp_path):
+    # A fresh copy per test, since tests activate and roll back
+    path = str(tmp_path / 'models')
+    shutil.copytree(published, path)
+    return path
+
+
+def loaded_paths():
+    return {os.path.abspath(entry['path']) for entry in registry.stats()}
+
+
+def test_publish_writes_complete_versions(directory):
+    manifest = read_manifest(directory)
+    assert sorted(manifest['versions']) == ['v1', 'v2', 'v3']
+    assert manifest['active'] == 'v3'
+    assert manifest['history'] == ['v1', 'v2', 'v3']
+    v1 = manifest['versions']['v1']
+    assert v1['metrics'] == {'f1': 0.9} and v1['data_sha256'] and v1['reference'] == 'df1.pkl'
+    assert sorted(os.listdir(os.path.join(directory, 'v1'))) == ['df1.pkl', 'pipeline.pkl',
+                                                                  'pipeline_inference.joblib']
+    assert 'reference' not in manifest['versions']['v2']
+    assert not [name for name in os.listdir(directory) if name.endswith('.tmp')]
+
+
+def test_publish_refuses_an_existing_version(directory):
+    with pytest.raises(ValueError, match='already exists'):
+        publish('pipeline.pkl', version='v2', directory=directory)
+
+
+def test_activate_and_rollback_follow_the_history(directory):
+    activate('v1', directory)
+    assert read_manifest(directory)['history'] == ['v1', 'v2', 'v3', 'v1']
+    assert rollback(directory)['active'] == 'v3'
+    assert rollback(directory)['active'] == 'v2'
+    assert rollback(directory)['active'] == 'v1'
+    with pytest.raises(ValueError, match='no earlier version'):
+        rollback(directory)
+    with pytest.raises(ValueError, match='unknown model version'):
+        activate('v9', directory)
+
+
+def test_refresh_swaps_to_the_active_version(directory):
+    manager = ModelManager(directory, poll=0)
+    assert manager.current().version == 'v3'
+    assert manager.swaps == 1
+    assert manager.refresh() is False
+
+    activate('v1', directory)
+    deployment = manager.current()
+    assert (deployment.version, deployment.tag) == ('v1', 'v1')
+    assert deployment.path == os.path.join(directory, 'v1', 'pipeline_inference.joblib')
+    assert manager.swaps == 2
+    assert manager.stats()['loaded'] == ['v3', 'v1']
+
+
+def test_rollback_reuses_the_loaded_version(directory, monkeypatch):
+    manager = ModelManager(directory, poll=0)
+    manager.current()
+    activate('v2', directory)
+    manager.current()
+    loads = []
+    monkeypatch.setattr(models, 'load_version', lambda *args: loads.append(args) or pytest.fail('reloaded'))
+    rollback(directory)
+    assert manager.current().version == 'v3'
+    assert loads == []
+
+
+def test_versions_beyond_keep_loaded_are_forgotten(directory):
+    manager = ModelManager(directory, poll=0)
+    activate('v1', directory)
+    manager.current()
+    v1 = manager.current().path
+    assert {v1, os.path.abspath(os.path.join(directory, 'v1', 'df1.pkl'))} <= loaded_paths()
+    for version in ('v2', 'v3'):
+        activate(version, directory)
+        manager.current()
+    assert manager.stats()['loaded'] == ['v2', 'v3']
+    # v1's model and its own reference frame are dropped from the artifact registry
+    assert not {os.path.abspath(v1), os.path.abspath(os.path.join(directory, 'v1', 'df1.pkl'))} & loaded_paths()
+
+
+def test_a_version_that_fails_to_load_is_not_retried(directory, monkeypatch):
+    manager = ModelManager(directory, poll=0)
+    manager.current()
+    publish('pipeline.pkl', version='broken', directory=directory)
+    with open(os.path.join(directory, 'broken', 'pipeline_inference.joblib'), 'wb') as file:
+        file.write(b'not a model')
+
+    calls = []
+    load_version = models.load_version
+    monkeypatch.setattr(models, 'load_version', lambda *args: calls.append(args[0]) or load_version(*args))
+    assert manager.refresh() is False
+    assert manager.refresh() is False
+    assert calls == ['broken']
+    # The version served before keeps serving
+    assert manager.current().version == 'v3'
+
+
+def test_concurrent_refreshes_swap_once(directory, monkeypatch):
+    manager = ModelManager(directory, poll=0)
+    manager.current()
+    activate('v1', directory)
+    load_version = models.load_version
+
+    def slow_load(*args):
+        # Widens the window in which every caller has seen the old version
+        time.sleep(0.05)
+        return load_version(*args)
+
+    monkeypatch.setattr(models, 'load_version', slow_load)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def refresh():
+        barrier.wait()
+        results.append(manager.refresh())
+
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+    assert manager.swaps == 2
+    assert manager.current().version == 'v1'
@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+
+from core import predcache
+from core.artifacts import unpickle
+from core.forest import FlatForest
+from core.predcache import (MemoryBackend, PredictionCache, SQLiteBackend, feature_keys, predict_cached,
+                            record_keys)
+from core.schema import CATEGORICAL, FEATURES
+
+
+class CountingScorer:
+    """A scorer that records how many rows it was asked to score."""
+
+    def __init__(self, scorer):
+        self.scorer = scorer
+        self.vocabulary = scorer.vocabulary
+        self.classes_ = scorer.classes_
+        self.rows = 0
+
+    def predict_proba(self, df):
+        self.rows += len(df)
+        return self.scorer.predict_proba(df)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBackend(max_entries=1000)
+    return SQLiteBackend(str(tmp_path / 'predictions.sqlite'), max_entries=1000)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(predcache.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(scope='module')
+def scorer(repo_root):
+    return FlatForest.from_pipeline(unpickle('pipeline.pkl'))
+
+
+@pytest.fixture
+def rows(reference):
+    return reference[FEATURES].head(50)
+
+
+def test_frame_and_record_keys_agree(rows):
+    records = rows.to_dict(orient='records')
+    assert feature_keys(rows, 'v1') == record_keys(records, 'v1')
+    # Key order of a JSON record does not matter
+    assert record_keys([dict(reversed(list(record.items()))) for record in records], 'v1') == record_keys(records, 'v1')
+
+
+def test_numbers_are_keyed_by_value(rows):
+    record = rows.iloc[0].to_dict()
+    as_floats = {column: value if column in CATEGORICAL else float(value)
+                 for column, value in record.items()}
+    assert record_keys([record], 'v1') == record_keys([as_floats], 'v1')
+    assert feature_keys(rows.astype({'cibil_score': float}), 'v1') == feature_keys(rows, 'v1')
+
+
+def test_keys_depend_on_every_feature_and_the_model_version(rows):
+    record = rows.iloc[0].to_dict()
+    key = record_keys([record], 'v1')[0]
+    assert record_keys([record], 'v2')[0] != key
+    for column in FEATURES:
+        changed = dict(record)
+        changed[column] = 'other' if isinstance(record[column], str) else record[column] + 1
+        assert record_keys([changed], 'v1')[0] != key, column
+    assert len(set(feature_keys(rows.drop_duplicates(), 'v1'))) == len(rows.drop_duplicates())
+
+
+def test_hits_return_the_stored_prediction(backend, clock):
+    cache = PredictionCache(backend)
+    cache.put_many([('a', (1.0, 0.9)), ('b', (0.0, 0.2))])
+    assert cache.get_many(['a', 'b', 'c']) == {'a': (1.0, 0.9), 'b': (0.0, 0.2)}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_entries_expire_after_the_ttl(backend, clock):
+    cache = PredictionCache(backend, ttl=60)
+    cache.put_many([('a', (1.0, 0.9))])
+    clock.now += 59
+    assert cache.get_many(['a']) == {'a': (1.0, 0.9)}
+    clock.now += 2
+    assert cache.get_many(['a']) == {}
+    # Expired entries are removed, not only skipped
+    assert len(backend) == 0
+
+
+def test_without_ttl_entries_never_expire(backend, clock):
+    cache = PredictionCache(backend, ttl=None)
+    cache.put_many([('a', (1.0, 0.9))])
+    clock.now += 10 ** 9
+    assert cache.get_many(['a']) == {'a': (1.0, 0.9)}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    for backend in (MemoryBackend(max_entries=2), SQLiteBackend(str(tmp_path / 'lru.sqlite'), max_entries=2)):
+        cache = PredictionCache(backend)
+        cache.put_many([('a', (1.0, 0.9))])
+        clock.now += 1
+        cache.put_many([('b', (1.0, 0.8))])
+        clock.now += 1
+        cache.get_many(['a'])
+        clock.now += 1
+        cache.put_many([('c', (0.0, 0.1))])
+        assert set(cache.get_many(['a', 'b', 'c'])) == {'a', 'c'}
+
+
+def test_predict_cached_scores_only_misses(backend, scorer, rows):
+    cache = PredictionCache(backend)
+    counting = CountingScorer(scorer)
+    expected = scorer.predict_proba(rows)[:, scorer.approved_index]
+
+    predictions, probabilities = predict_cached(counting, rows, cache, version='v1')
+    assert counting.rows == len(rows)
+    np.testing.assert_array_equal(probabilities, expected)
+
+    predictions_again, probabilities_again = predict_cached(counting, rows, cache, version='v1')
+    assert counting.rows == len(rows)
+    np.testing.assert_array_equal(predictions_again, predictions)
+    np.testing.assert_array_equal(probabilities_again, probabilities)
+
+
+def test_a_new_model_version_misses(backend, scorer, rows):
+    cache = PredictionCache(backend)
+    counting = CountingScorer(scorer)
+    predict_cached(counting, rows, cache, version='v1')
+    predict_cached(counting, rows, cache, version='v2')
+    assert counting.rows == 2 * len(rows)
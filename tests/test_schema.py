@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.schema import FEATURES, SchemaError, normalize_frame, normalize_record
+
+# The model was trained on the CSV's own spellings, with a leading space
+MODEL_VOCABULARY = {'education': [' Graduate', ' Not Graduate'], 'self_employed': [' No', ' Yes']}
+
+
+@pytest.fixture
+def record():
+    return {
+        'no_of_dependents': 2, 'education': 'Graduate', 'self_employed': 'No', 'income_annum': 9600000,
+        'loan_amount': 29900000, 'loan_term': 12, 'cibil_score': 778, 'residential_assets_value': 2400000,
+        'commercial_assets_value': 17600000, 'luxury_assets_value': 22700000, 'bank_asset_value': 8000000,
+    }
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('Graduate', 'Graduate'),
+    (' Graduate', 'Graduate'),
+    ('graduate ', 'Graduate'),
+    ('Graduated', 'Graduate'),
+    ('NOT GRADUATED', 'Not Graduate'),
+    (' Not Graduate', 'Not Graduate'),
+])
+def test_education_aliases_and_spellings(record, value, expected):
+    record['education'] = value
+    assert normalize_record(record)['education'] == expected
+    frame = normalize_frame(pd.DataFrame([record]))
+    assert frame['education'].tolist() == [expected]
+
+
+def test_categories_take_the_model_spelling(record):
+    record['self_employed'] = 'yes'
+    normalized = normalize_record(record, MODEL_VOCABULARY)
+    assert (normalized['education'], normalized['self_employed']) == (' Graduate', ' Yes')
+    frame = normalize_frame(pd.DataFrame([record]), MODEL_VOCABULARY)
+    assert frame[['education', 'self_employed']].iloc[0].tolist() == [' Graduate', ' Yes']
+
+
+def test_reference_frame_round_trips(reference):
+    # df1.pkl keeps the leading spaces; canonical values drop them, the model vocabulary restores them
+    canonical = normalize_frame(reference)
+    assert set(canonical['education']) == {'Graduate', 'Not Graduate'}
+    restored = normalize_frame(canonical, MODEL_VOCABULARY)
+    pd.testing.assert_frame_equal(restored, reference[FEATURES], check_dtype=False)
+
+
+def test_record_and_frame_agree(record):
+    frame = normalize_frame(pd.DataFrame([record]))
+    assert frame.iloc[0].to_dict() == normalize_record(record)
+    assert list(frame.columns) == FEATURES
+    assert frame['cibil_score'].dtype == np.int64 and frame['loan_amount'].dtype == np.float64
+
+
+@pytest.mark.parametrize('field,value,message', [
+    ('cibil_score', 250, 'cibil_score below 300'),
+    ('cibil_score', 901, 'cibil_score above 900'),
+    ('loan_term', 0, 'loan_term below 1'),
+    ('no_of_dependents', 21, 'no_of_dependents above 20'),
+    ('loan_amount', -1, 'loan_amount below 0'),
+    ('loan_term', 12.5, 'loan_term must be a whole number'),
+])
+def test_out_of_range_values_are_rejected(record, field, value, message):
+    record[field] = value
+    with pytest.raises(SchemaError, match=message):
+        normalize_record(record)
+    with pytest.raises(SchemaError, match=message):
+        normalize_frame(pd.DataFrame([record]))
+
+
+@pytest.mark.parametrize('field,value', [
+    ('cibil_score', None),
+    ('cibil_score', float('nan')),
+    ('cibil_score', 'high'),
+    ('income_annum', True),
+    ('education', 'PhD'),
+    ('education', 1),
+    ('self_employed', None),
+])
+def test_invalid_values_are_rejected(record, field, value):
+    record[field] = value
+    with pytest.raises(SchemaError, match=field):
+        normalize_record(record)
+    with pytest.raises(SchemaError, match=field):
+        normalize_frame(pd.DataFrame([record]))
+
+
+def test_missing_fields_are_rejected(record):
+    del record['cibil_score'], record['education']
+    with pytest.raises(SchemaError, match='missing fields: education, cibil_score'):
+        normalize_record(record)
+    with pytest.raises(SchemaError, match='missing columns: education, cibil_score'):
+        normalize_frame(pd.DataFrame([record]))
+
+
+def test_non_objects_are_rejected():
+    with pytest.raises(SchemaError, match='JSON object'):
+        normalize_record([1, 2, 3])
+
+
+def test_every_problem_in_a_frame_is_reported(record):
+    frame = pd.DataFrame([record, record])
+    frame.loc[0, 'cibil_score'] = 100
+    frame.loc[1, 'education'] = 'PhD'
+    with pytest.raises(SchemaError) as error:
+        normalize_frame(frame)
+    assert error.value.problems == ["unknown education values: 'PhD'", 'cibil_score below 300']
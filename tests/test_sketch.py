@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from core.schema import NUMERIC
+from core.sketch import DEFAULT_K, KLLSketch, merged, sketch_groups
+
+QUARTILES = [0.25, 0.5, 0.75]
+
+# Normalized rank error stated for KLL sketches (core.sketch)
+RANK_ERROR = 2 / DEFAULT_K
+
+
+def rank_error(data, estimate, q):
+    # Distance from q to the range of normalized ranks `estimate` holds in the data (ties span a range)
+    data = np.sort(data)
+    low = np.searchsorted(data, estimate, side='left') / len(data)
+    high = np.searchsorted(data, estimate, side='right') / len(data)
+    return max(low - q, q - high, 0.0)
+
+
+def assert_within_bound(sketch, data):
+    for q, estimate in zip(QUARTILES, sketch.quantile(QUARTILES)):
+        assert rank_error(data, estimate, q) <= RANK_ERROR, (q, estimate, np.quantile(data, q))
+
+
+@pytest.fixture(scope='module')
+def tiled(reference):
+    # 20 shuffled copies of df1, so the sketch compacts through several levels
+    rng = np.random.default_rng(0)
+    columns = {}
+    for column in NUMERIC:
+        values = np.tile(reference[column].to_numpy(dtype=float), 20)
+        rng.shuffle(values)
+        columns[column] = values
+    return columns
+
+
+@pytest.mark.parametrize('column', NUMERIC)
+@pytest.mark.parametrize('seed', range(5))
+def test_quartiles_within_rank_error(reference, column, seed):
+    data = reference[column].to_numpy(dtype=float)
+    sketch = KLLSketch(seed=seed)
+    for chunk in np.array_split(data, 10):
+        sketch.update(chunk)
+    assert sketch.count == len(data)
+    assert_within_bound(sketch, data)
+
+
+@pytest.mark.parametrize('column', NUMERIC)
+def test_merged_quartiles_within_rank_error(tiled, column):
+    data = tiled[column]
+    parts = [KLLSketch(seed=[1, index]).update(chunk) for index, chunk in enumerate(np.array_split(data, 7))]
+    sketch = merged(parts)
+    assert sketch.count == len(data)
+    assert len(sketch.levels) > 3
+    assert_within_bound(sketch, data)
+
+
+def test_grouped_sketches_within_rank_error(reference):
+    # The path the cube takes out of core: partitions sketched per group, then merged
+    frame = reference.assign(group=np.arange(len(reference)) % 3)
+    sketches = sketch_groups([frame.iloc[start::5] for start in range(5)], [('group', column) for column in NUMERIC])
+    for column in NUMERIC:
+        for group, sketch in sketches['group', column].items():
+            data = frame.loc[frame['group'] == group, column].to_numpy(dtype=float)
+            assert sketch.count == len(data)
+            assert_within_bound(sketch, data)
+
+
+def test_exact_statistics(reference):
+    data = reference['loan_amount'].to_numpy(dtype=float)
+    sketch = KLLSketch(seed=0).update(data)
+    assert (sketch.minimum, sketch.maximum) == (data.min(), data.max())
+    assert sketch.mean == pytest.approx(data.mean(), rel=1e-12)
+    assert sketch.std == pytest.approx(data.std(ddof=1), rel=1e-9)
+
+
+def test_small_inputs_are_exact():
+    data = np.random.default_rng(0).normal(size=DEFAULT_K // 2)
+    sketch = KLLSketch(seed=0).update(data)
+    np.testing.assert_allclose(sketch.quantile(QUARTILES), np.quantile(data, QUARTILES))